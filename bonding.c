@@ -698,7 +698,7 @@ bonding_create(const char *name, struct device_type *devtype,
 		return NULL;
 	}
 
-	dev->config_pending = true;
+	device_set_config_pending(dev, true);
 	bdev->retry.cb = bonding_retry_ports;
 
 	bdev->set_state = dev->set_state;
@@ -1257,7 +1257,7 @@ bridge_vlan_update(struct vlist_tree *tree, struct vlist_node *node_new,
 	if (node_new)
 		vlan_new->pending = true;
 
-	bst->dev.config_pending = true;
+	device_set_config_pending(&bst->dev, true);
 
 out:
 	bridge_vlan_free(vlan_old);
@@ -1297,7 +1297,7 @@ bridge_create(const char *name, struct device_type *devtype,
 		return NULL;
 	}
 
-	dev->config_pending = true;
+	device_set_config_pending(dev, true);
 	bst->retry.cb = bridge_retry_members;
 
 	bst->set_state = dev->set_state;
@@ -12,9 +12,14 @@
  * GNU General Public License for more details.
  */
 #define _GNU_SOURCE
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <limits.h>
 #include <string.h>
 #include <stdlib.h>
 #include <stdio.h>
+#include <fcntl.h>
+#include <glob.h>
 
 #include <uci.h>
 
@@ -28,6 +33,102 @@
 #include "wireless.h"
 #include "config.h"
 #include "system.h"
+#include "stats.h"
+
+#ifdef DUMMY_MODE
+#define CONFIG_SAVEDIR		"./tmp"
+#else
+#define CONFIG_SAVEDIR		UCI_SAVEDIR
+#endif
+
+/*
+ * The snapshot holds the blobs the network package was converted to by
+ * uci_to_blob, one record per config object in the order the objects were
+ * created. As long as the stamps of the config files, the netifd binary and
+ * the handlers match, a start or reload replays the records instead of
+ * loading the package. The wireless package is always parsed.
+ */
+#define CONFIG_SNAPSHOT_FILE	"network.snapshot"
+#define CONFIG_SNAPSHOT_MAGIC	0x6e736e70
+#define CONFIG_SNAPSHOT_VERSION	1
+
+struct config_snapshot_hdr {
+	uint32_t magic;
+	uint32_t version;
+	uint32_t len;
+};
+
+enum {
+	SNAPSHOT_REC_BRIDGE,
+	SNAPSHOT_REC_VLAN,
+	SNAPSHOT_REC_DEVICE,
+	SNAPSHOT_REC_BRIDGE_INTERFACE,
+	SNAPSHOT_REC_INTERFACE,
+	SNAPSHOT_REC_ALIAS,
+	SNAPSHOT_REC_ROUTE,
+	SNAPSHOT_REC_NEIGHBOR,
+	SNAPSHOT_REC_RULE,
+	SNAPSHOT_REC_GLOBALS,
+};
+
+#define SNAPSHOT_F_V6			(1 << 0)
+#define SNAPSHOT_F_DEVICE_CONFIG	(1 << 1)
+
+enum {
+	SNAPSHOT_ATTR_KIND,
+	SNAPSHOT_ATTR_NAME,
+	SNAPSHOT_ATTR_TYPE,
+	SNAPSHOT_ATTR_FLAGS,
+	SNAPSHOT_ATTR_ALLOC,
+	SNAPSHOT_ATTR_CONFIG,
+	__SNAPSHOT_ATTR_MAX
+};
+
+static const struct blobmsg_policy snapshot_attrs[__SNAPSHOT_ATTR_MAX] = {
+	[SNAPSHOT_ATTR_KIND] = { "kind", BLOBMSG_TYPE_INT32 },
+	[SNAPSHOT_ATTR_NAME] = { "name", BLOBMSG_TYPE_STRING },
+	[SNAPSHOT_ATTR_TYPE] = { "type", BLOBMSG_TYPE_STRING },
+	[SNAPSHOT_ATTR_FLAGS] = { "flags", BLOBMSG_TYPE_INT32 },
+	[SNAPSHOT_ATTR_ALLOC] = { "alloc", BLOBMSG_TYPE_TABLE },
+	[SNAPSHOT_ATTR_CONFIG] = { "config", BLOBMSG_TYPE_TABLE },
+};
+
+enum {
+	GLOBALS_ATTR_ULA_PREFIX,
+	GLOBALS_ATTR_DEFAULT_TTL,
+	__GLOBALS_ATTR_MAX
+};
+
+static const struct blobmsg_policy globals_attrs[__GLOBALS_ATTR_MAX] = {
+	[GLOBALS_ATTR_ULA_PREFIX] = { "ula_prefix", BLOBMSG_TYPE_STRING },
+	[GLOBALS_ATTR_DEFAULT_TTL] = { "ip_default_ttl", BLOBMSG_TYPE_STRING },
+};
+
+enum {
+	BRVLAN_ATTR_VID,
+	BRVLAN_ATTR_LOCAL,
+	BRVLAN_ATTR_PORTS,
+	BRVLAN_ATTR_ALIAS,
+	__BRVLAN_ATTR_MAX,
+};
+
+static const struct blobmsg_policy vlan_attrs[__BRVLAN_ATTR_MAX] = {
+	[BRVLAN_ATTR_VID] = { "vlan", BLOBMSG_TYPE_INT32 },
+	[BRVLAN_ATTR_LOCAL] = { "local", BLOBMSG_TYPE_BOOL },
+	[BRVLAN_ATTR_PORTS] = { "ports", BLOBMSG_TYPE_ARRAY },
+	[BRVLAN_ATTR_ALIAS] = { "alias", BLOBMSG_TYPE_ARRAY },
+};
+
+static const struct uci_blob_param_info vlan_attr_info[__BRVLAN_ATTR_MAX] = {
+	[BRVLAN_ATTR_PORTS] = { .type = BLOBMSG_TYPE_STRING },
+	[BRVLAN_ATTR_ALIAS] = { .type = BLOBMSG_TYPE_STRING },
+};
+
+static const struct uci_blob_param_list vlan_attr_list = {
+	.n_params = __BRVLAN_ATTR_MAX,
+	.params = vlan_attrs,
+	.info = vlan_attr_info,
+};
 
 bool config_init = false;
 
@@ -37,6 +138,52 @@ static struct uci_package *uci_wireless;
 static struct blob_attr *board_netdevs;
 static struct blob_buf b;
 
+static struct blob_buf snapshot;
+static void *snapshot_list;
+static bool snapshot_recording;
+static void *snapshot_map;
+static size_t snapshot_map_len;
+static struct blob_attr *snapshot_records;
+
+static void
+config_snapshot_add(int kind, const char *name, const char *type,
+		    unsigned int flags, struct blob_attr *config,
+		    unsigned int alloc_len)
+{
+	void *c, *t;
+
+	if (!snapshot_recording)
+		return;
+
+	c = blobmsg_open_table(&snapshot, NULL);
+	blobmsg_add_u32(&snapshot, "kind", kind);
+	if (name)
+		blobmsg_add_string(&snapshot, "name", name);
+	if (type)
+		blobmsg_add_string(&snapshot, "type", type);
+	if (flags)
+		blobmsg_add_u32(&snapshot, "flags", flags);
+	if (alloc_len) {
+		t = blobmsg_open_table(&snapshot, "alloc");
+		blob_put_raw(&snapshot, blob_data(config), alloc_len);
+		blobmsg_close_table(&snapshot, t);
+	}
+	t = blobmsg_open_table(&snapshot, "config");
+	blob_put_raw(&snapshot, blob_data(config), blob_len(config));
+	blobmsg_close_table(&snapshot, t);
+	blobmsg_close_table(&snapshot, c);
+}
+
+static struct blob_attr *
+config_snapshot_blob(struct blob_buf *buf, struct blob_attr *attr)
+{
+	blob_buf_init(buf, 0);
+	if (attr)
+		blob_put_raw(buf, blobmsg_data(attr), blobmsg_len(attr));
+
+	return buf->head;
+}
+
 static int
 config_section_idx(struct uci_section *s)
 {
@@ -146,6 +293,8 @@ config_parse_bridge_interface(struct uci_section *s, struct device_type *devtype
 	config_fixup_bridge_ports(s);
 	config_fixup_bridge_vlan_filtering(s, name);
 	uci_to_blob(&b, s, devtype->config_params);
+	config_snapshot_add(SNAPSHOT_REC_BRIDGE_INTERFACE, name, devtype->name,
+			    0, b.head, 0);
 	if (!device_create(name, devtype, b.head)) {
 		D(INTERFACE, "Failed to create '%s' device for interface '%s'\n",
 			devtype->name, s->e.name);
@@ -156,12 +305,36 @@ config_parse_bridge_interface(struct uci_section *s, struct device_type *devtype
 	return 0;
 }
 
+static void
+config_add_interface(struct interface *iface, bool alias, struct blob_attr *data)
+{
+	struct blob_attr *config;
+
+	config = blob_memdup(data);
+	if (!config)
+		goto error;
+
+	if (alias) {
+		if (!interface_add_alias(iface, config))
+			goto error_free_config;
+	} else {
+		if (!interface_add(iface, config))
+			goto error_free_config;
+	}
+	return;
+
+error_free_config:
+	free(config);
+error:
+	free(iface);
+}
+
 static void
 config_parse_interface(struct uci_section *s, bool alias)
 {
 	struct interface *iface;
 	const char *type = NULL, *disabled;
-	struct blob_attr *config;
+	unsigned int alloc_len;
 	bool bridge = false;
 	struct device_type *devtype = NULL;
 
@@ -185,6 +358,7 @@ config_parse_interface(struct uci_section *s, bool alias)
 	}
 
 	uci_to_blob(&b, s, &interface_attr_list);
+	alloc_len = blob_len(b.head);
 
 	iface = interface_alloc(s->e.name, b.head, false);
 	if (!iface)
@@ -196,23 +370,11 @@ config_parse_interface(struct uci_section *s, bool alias)
 	if (!bridge && uci_to_blob(&b, s, simple_device_type.config_params))
 		iface->device_config = true;
 
-	config = blob_memdup(b.head);
-	if (!config)
-		goto error;
-
-	if (alias) {
-		if (!interface_add_alias(iface, config))
-			goto error_free_config;
-	} else {
-		if (!interface_add(iface, config))
-			goto error_free_config;
-	}
-	return;
-
-error_free_config:
-	free(config);
-error:
-	free(iface);
+	config_snapshot_add(alias ? SNAPSHOT_REC_ALIAS : SNAPSHOT_REC_INTERFACE,
+			    s->e.name, NULL,
+			    iface->device_config ? SNAPSHOT_F_DEVICE_CONFIG : 0,
+			    b.head, alloc_len);
+	config_add_interface(iface, alias, b.head);
 }
 
 static void
@@ -224,6 +386,8 @@ config_parse_route(struct uci_section *s, bool v6)
 	route = blobmsg_open_array(&b, "route");
 	uci_to_blob(&b, s, &route_attr_list);
 	blobmsg_close_array(&b, route);
+	config_snapshot_add(SNAPSHOT_REC_ROUTE, NULL, NULL,
+			    v6 ? SNAPSHOT_F_V6 : 0, b.head, 0);
 	interface_ip_add_route(NULL, blob_data(b.head), v6);
 }
 
@@ -235,6 +399,8 @@ config_parse_neighbor(struct uci_section *s, bool v6)
 	neighbor = blobmsg_open_array(&b, "neighbor");
 	uci_to_blob(&b,s, &neighbor_attr_list);
 	blobmsg_close_array(&b, neighbor);
+	config_snapshot_add(SNAPSHOT_REC_NEIGHBOR, NULL, NULL,
+			    v6 ? SNAPSHOT_F_V6 : 0, b.head, 0);
 	interface_ip_add_neighbor(NULL, blob_data(b.head), v6);
 }
 
@@ -247,106 +413,46 @@ config_parse_rule(struct uci_section *s, bool v6)
 	rule = blobmsg_open_array(&b, "rule");
 	uci_to_blob(&b, s, &rule_attr_list);
 	blobmsg_close_array(&b, rule);
+	config_snapshot_add(SNAPSHOT_REC_RULE, NULL, NULL,
+			    v6 ? SNAPSHOT_F_V6 : 0, b.head, 0);
 	iprule_add(blob_data(b.head), v6);
 }
 
 static void
-config_init_devices(bool bridge)
+config_apply_device(const char *name, struct device_type *devtype,
+		    struct blob_attr *config)
 {
-	struct uci_element *e;
-
-	uci_foreach_element(&uci_network->sections, e) {
-		const struct uci_blob_param_list *params = NULL;
-		struct uci_section *s = uci_to_section(e);
-		struct device_type *devtype = NULL;
-		struct device *dev;
-		const char *type, *name;
-
-		if (strcmp(s->type, "device") != 0)
-			continue;
-
-		name = uci_lookup_option_string(uci_ctx, s, "name");
-		if (!name)
-			continue;
-
-		type = uci_lookup_option_string(uci_ctx, s, "type");
-		if (type)
-			devtype = device_type_get(type);
-
-		if (bridge != (devtype && devtype->bridge_capability))
-			continue;
-
-		if (devtype)
-			params = devtype->config_params;
-		if (!params)
-			params = simple_device_type.config_params;
-
-		if (devtype && devtype->bridge_capability) {
-			config_fixup_bridge_ports(s);
-			config_fixup_bridge_vlan_filtering(s, name);
-		}
+	struct device *dev;
 
-		blob_buf_init(&b, 0);
-		uci_to_blob(&b, s, params);
-		if (devtype) {
-			dev = device_create(name, devtype, b.head);
-			if (!dev)
-				continue;
-		} else {
-			dev = device_get(name, 1);
-			if (!dev)
-				continue;
+	if (devtype) {
+		dev = device_create(name, devtype, config);
+		if (!dev)
+			return;
+	} else {
+		dev = device_get(name, 1);
+		if (!dev)
+			return;
 
-			dev->current_config = true;
-			device_apply_config(dev, dev->type, b.head);
-		}
-		dev->default_config = false;
+		dev->current_config = true;
+		device_apply_config(dev, dev->type, config);
 	}
+	dev->default_config = false;
 }
 
 static void
-config_parse_vlan(struct device *dev, struct uci_section *s)
+config_apply_vlan(struct device *dev, struct blob_attr *config)
 {
-	enum {
-		BRVLAN_ATTR_VID,
-		BRVLAN_ATTR_LOCAL,
-		BRVLAN_ATTR_PORTS,
-		BRVLAN_ATTR_ALIAS,
-		__BRVLAN_ATTR_MAX,
-	};
-	static const struct blobmsg_policy vlan_attrs[__BRVLAN_ATTR_MAX] = {
-		[BRVLAN_ATTR_VID] = { "vlan", BLOBMSG_TYPE_INT32 },
-		[BRVLAN_ATTR_LOCAL] = { "local", BLOBMSG_TYPE_BOOL },
-		[BRVLAN_ATTR_PORTS] = { "ports", BLOBMSG_TYPE_ARRAY },
-		[BRVLAN_ATTR_ALIAS] = { "alias", BLOBMSG_TYPE_ARRAY },
-	};
-	static const struct uci_blob_param_info vlan_attr_info[__BRVLAN_ATTR_MAX] = {
-		[BRVLAN_ATTR_PORTS] = { .type = BLOBMSG_TYPE_STRING },
-		[BRVLAN_ATTR_ALIAS] = { .type = BLOBMSG_TYPE_STRING },
-	};
-	static const struct uci_blob_param_list vlan_attr_list = {
-		.n_params = __BRVLAN_ATTR_MAX,
-		.params = vlan_attrs,
-		.info = vlan_attr_info,
-	};
 	struct blob_attr *tb[__BRVLAN_ATTR_MAX];
 	struct blob_attr *cur;
 	struct bridge_vlan_port *port;
 	struct bridge_vlan *vlan;
 	unsigned int vid;
-	const char *val;
 	char *name_buf;
 	int name_len = 0;
 	int n_ports = 0;
 	int rem;
 
-	val = uci_lookup_option_string(uci_ctx, s, "vlan");
-	if (!val)
-		return;
-
-	blob_buf_init(&b, 0);
-	uci_to_blob(&b, s, &vlan_attr_list);
-	blobmsg_parse(vlan_attrs, __BRVLAN_ATTR_MAX, tb, blob_data(b.head), blob_len(b.head));
+	blobmsg_parse(vlan_attrs, __BRVLAN_ATTR_MAX, tb, blob_data(config), blob_len(config));
 
 	if (!tb[BRVLAN_ATTR_VID])
 		return;
@@ -404,6 +510,187 @@ config_parse_vlan(struct device *dev, struct uci_section *s)
 	vlist_add(&dev->vlans, &vlan->node, &vlan->vid);
 }
 
+static void
+config_apply_globals(struct blob_attr *data)
+{
+	struct blob_attr *tb[__GLOBALS_ATTR_MAX];
+	struct global_settings config = {};
+	const char *ula_prefix = NULL;
+
+	blobmsg_parse(globals_attrs, __GLOBALS_ATTR_MAX, tb, blob_data(data), blob_len(data));
+
+	if (tb[GLOBALS_ATTR_ULA_PREFIX])
+		ula_prefix = blobmsg_get_string(tb[GLOBALS_ATTR_ULA_PREFIX]);
+	interface_ip_set_ula_prefix(ula_prefix);
+
+	if (tb[GLOBALS_ATTR_DEFAULT_TTL]) {
+		config.ttl = strtoul(blobmsg_get_string(tb[GLOBALS_ATTR_DEFAULT_TTL]), NULL, 10);
+		if (config.ttl < 1 || config.ttl > 255) {
+			netifd_log_message(L_WARNING, "Invalid value '%d' for ip4_default_ttl (allowed 1-255)\n");
+		} else {
+			config.flags |= GLOBAL_OPT_TTL;
+		}
+	}
+
+	system_globals_apply_settings(&config);
+}
+
+static void
+config_snapshot_apply(unsigned int kind, struct blob_attr **tb)
+{
+	struct blob_attr *config = tb[SNAPSHOT_ATTR_CONFIG];
+	struct device_type *devtype = NULL;
+	struct interface *iface;
+	struct device *dev;
+	const char *name = NULL;
+	unsigned int flags = 0;
+	bool v6;
+
+	if (tb[SNAPSHOT_ATTR_NAME])
+		name = blobmsg_get_string(tb[SNAPSHOT_ATTR_NAME]);
+	if (tb[SNAPSHOT_ATTR_TYPE])
+		devtype = device_type_get(blobmsg_get_string(tb[SNAPSHOT_ATTR_TYPE]));
+	if (tb[SNAPSHOT_ATTR_FLAGS])
+		flags = blobmsg_get_u32(tb[SNAPSHOT_ATTR_FLAGS]);
+	v6 = !!(flags & SNAPSHOT_F_V6);
+
+	switch (kind) {
+	case SNAPSHOT_REC_BRIDGE:
+	case SNAPSHOT_REC_DEVICE:
+		if (name)
+			config_apply_device(name, devtype, config_snapshot_blob(&b, config));
+		break;
+	case SNAPSHOT_REC_VLAN:
+		if (!name)
+			break;
+
+		dev = device_get(name, 0);
+		if (!dev || !dev->vlans.update)
+			break;
+
+		config_apply_vlan(dev, config_snapshot_blob(&b, config));
+		break;
+	case SNAPSHOT_REC_BRIDGE_INTERFACE:
+		if (!name || !devtype)
+			break;
+
+		if (!device_create(name, devtype, config_snapshot_blob(&b, config)))
+			D(INTERFACE, "Failed to create '%s' device '%s'\n",
+				devtype->name, name);
+		break;
+	case SNAPSHOT_REC_INTERFACE:
+	case SNAPSHOT_REC_ALIAS:
+		if (!name)
+			break;
+
+		iface = interface_alloc(name, config_snapshot_blob(&b, tb[SNAPSHOT_ATTR_ALLOC]), false);
+		if (!iface)
+			break;
+
+		if (flags & SNAPSHOT_F_DEVICE_CONFIG)
+			iface->device_config = true;
+
+		config_add_interface(iface, kind == SNAPSHOT_REC_ALIAS,
+				     config_snapshot_blob(&b, config));
+		break;
+	case SNAPSHOT_REC_ROUTE:
+		interface_ip_add_route(NULL, blob_data(config_snapshot_blob(&b, config)), v6);
+		break;
+	case SNAPSHOT_REC_NEIGHBOR:
+		interface_ip_add_neighbor(NULL, blob_data(config_snapshot_blob(&b, config)), v6);
+		break;
+	case SNAPSHOT_REC_RULE:
+		iprule_add(blob_data(config_snapshot_blob(&b, config)), v6);
+		break;
+	case SNAPSHOT_REC_GLOBALS:
+		config_apply_globals(config_snapshot_blob(&b, config));
+		break;
+	}
+}
+
+static void
+config_snapshot_replay(unsigned int kinds)
+{
+	struct blob_attr *tb[__SNAPSHOT_ATTR_MAX];
+	struct blob_attr *cur;
+	unsigned int kind;
+	int rem;
+
+	blobmsg_for_each_attr(cur, snapshot_records, rem) {
+		blobmsg_parse(snapshot_attrs, __SNAPSHOT_ATTR_MAX, tb,
+			      blobmsg_data(cur), blobmsg_len(cur));
+		if (!tb[SNAPSHOT_ATTR_KIND] || !tb[SNAPSHOT_ATTR_CONFIG])
+			continue;
+
+		kind = blobmsg_get_u32(tb[SNAPSHOT_ATTR_KIND]);
+		if (kind < 32 && (kinds & (1 << kind)))
+			config_snapshot_apply(kind, tb);
+	}
+}
+
+static void
+config_init_devices(bool bridge)
+{
+	struct uci_element *e;
+
+	if (snapshot_records) {
+		config_snapshot_replay(1 << (bridge ? SNAPSHOT_REC_BRIDGE : SNAPSHOT_REC_DEVICE));
+		return;
+	}
+
+	uci_foreach_element(&uci_network->sections, e) {
+		const struct uci_blob_param_list *params = NULL;
+		struct uci_section *s = uci_to_section(e);
+		struct device_type *devtype = NULL;
+		const char *type, *name;
+
+		if (strcmp(s->type, "device") != 0)
+			continue;
+
+		name = uci_lookup_option_string(uci_ctx, s, "name");
+		if (!name)
+			continue;
+
+		type = uci_lookup_option_string(uci_ctx, s, "type");
+		if (type)
+			devtype = device_type_get(type);
+
+		if (bridge != (devtype && devtype->bridge_capability))
+			continue;
+
+		if (devtype)
+			params = devtype->config_params;
+		if (!params)
+			params = simple_device_type.config_params;
+
+		if (devtype && devtype->bridge_capability) {
+			config_fixup_bridge_ports(s);
+			config_fixup_bridge_vlan_filtering(s, name);
+		}
+
+		blob_buf_init(&b, 0);
+		uci_to_blob(&b, s, params);
+		config_snapshot_add(bridge ? SNAPSHOT_REC_BRIDGE : SNAPSHOT_REC_DEVICE,
+				    name, devtype ? devtype->name : NULL, 0, b.head, 0);
+		config_apply_device(name, devtype, b.head);
+	}
+}
+
+static void
+config_parse_vlan(struct device *dev, struct uci_section *s)
+{
+	const char *val;
+
+	val = uci_lookup_option_string(uci_ctx, s, "vlan");
+	if (!val)
+		return;
+
+	blob_buf_init(&b, 0);
+	uci_to_blob(&b, s, &vlan_attr_list);
+	config_snapshot_add(SNAPSHOT_REC_VLAN, dev->ifname, NULL, 0, b.head, 0);
+	config_apply_vlan(dev, b.head);
+}
+
 
 static void
 config_init_vlans(void)
@@ -412,6 +699,12 @@ config_init_vlans(void)
 	struct device *dev;
 
 	device_vlan_update(false);
+	if (snapshot_records) {
+		config_snapshot_replay(1 << SNAPSHOT_REC_VLAN);
+		device_vlan_update(true);
+		return;
+	}
+
 	uci_foreach_element(&uci_network->sections, e) {
 		struct uci_section *s = uci_to_section(e);
 		const char *name;
@@ -447,7 +740,7 @@ config_init_package(const char *config)
 			uci_set_confdir(ctx, config_path);
 
 #ifdef DUMMY_MODE
-		uci_set_savedir(ctx, "./tmp");
+		uci_set_savedir(ctx, CONFIG_SAVEDIR);
 #endif
 	} else {
 		p = uci_lookup_package(ctx, config);
@@ -466,6 +759,13 @@ config_init_interfaces(void)
 {
 	struct uci_element *e;
 
+	if (snapshot_records) {
+		config_snapshot_replay((1 << SNAPSHOT_REC_BRIDGE_INTERFACE) |
+				       (1 << SNAPSHOT_REC_INTERFACE) |
+				       (1 << SNAPSHOT_REC_ALIAS));
+		return;
+	}
+
 	uci_foreach_element(&uci_network->sections, e) {
 		struct uci_section *s = uci_to_section(e);
 
@@ -490,6 +790,12 @@ config_init_ip(void)
 	vlist_for_each_element(&interfaces, iface, node)
 		interface_ip_update_start(&iface->config_ip);
 
+	if (snapshot_records) {
+		config_snapshot_replay((1 << SNAPSHOT_REC_ROUTE) |
+				       (1 << SNAPSHOT_REC_NEIGHBOR));
+		goto out;
+	}
+
 	uci_foreach_element(&uci_network->sections, e) {
 		struct uci_section *s = uci_to_section(e);
 
@@ -503,6 +809,7 @@ config_init_ip(void)
 			config_parse_neighbor(s, true);
 	}
 
+out:
 	vlist_for_each_element(&interfaces, iface, node)
 		interface_ip_update_complete(&iface->config_ip);
 }
@@ -514,6 +821,11 @@ config_init_rules(void)
 
 	iprule_update_start();
 
+	if (snapshot_records) {
+		config_snapshot_replay(1 << SNAPSHOT_REC_RULE);
+		goto out;
+	}
+
 	uci_foreach_element(&uci_network->sections, e) {
 		struct uci_section *s = uci_to_section(e);
 
@@ -523,32 +835,37 @@ config_init_rules(void)
 			config_parse_rule(s, true);
 	}
 
+out:
 	iprule_update_complete();
 }
 
 static void
 config_init_globals(void)
 {
-	struct uci_section *globals = uci_lookup_section(uci_ctx, uci_network, "globals");
+	struct uci_section *globals;
+	const char *val;
+
+	if (snapshot_records) {
+		config_snapshot_replay(1 << SNAPSHOT_REC_GLOBALS);
+		return;
+	}
+
+	globals = uci_lookup_section(uci_ctx, uci_network, "globals");
 	if (!globals)
 		return;
 
-	const char *ula_prefix = uci_lookup_option_string(uci_ctx, globals, "ula_prefix");
-	interface_ip_set_ula_prefix(ula_prefix);
+	blob_buf_init(&b, 0);
 
-	struct global_settings config = {};
+	val = uci_lookup_option_string(uci_ctx, globals, "ula_prefix");
+	if (val)
+		blobmsg_add_string(&b, "ula_prefix", val);
 
-	const char *default_ttl = uci_lookup_option_string(uci_ctx, globals, "ip_default_ttl");
-	if (default_ttl) {
-		config.ttl = strtoul(default_ttl, NULL, 10);
-		if (config.ttl < 1 || config.ttl > 255) {
-			netifd_log_message(L_WARNING, "Invalid value '%d' for ip4_default_ttl (allowed 1-255)\n");
-		} else {
-			config.flags |= GLOBAL_OPT_TTL;
-		}
-	}
+	val = uci_lookup_option_string(uci_ctx, globals, "ip_default_ttl");
+	if (val)
+		blobmsg_add_string(&b, "ip_default_ttl", val);
 
-	system_globals_apply_settings(&config);
+	config_snapshot_add(SNAPSHOT_REC_GLOBALS, NULL, NULL, 0, b.head, 0);
+	config_apply_globals(b.head);
 }
 
 static void
@@ -749,18 +1066,234 @@ config_init_board(void)
 	board_netdevs = blob_memdup(cur);
 }
 
-int
-config_init_all(void)
+static void
+config_snapshot_stamps(struct blob_buf *buf)
+{
+	const char *confdir = config_path ? config_path : UCI_CONFDIR;
+	char path[PATH_MAX];
+	void *c, *t;
+	glob_t g;
+	size_t i;
+
+	c = blobmsg_open_table(buf, "stamps");
+	blobmsg_add_string(buf, "netifd", format_file_stamp("/proc/self/exe"));
+
+	snprintf(path, sizeof(path), "%s/network", confdir);
+	blobmsg_add_string(buf, "config", format_file_stamp(path));
+	snprintf(path, sizeof(path), "%s/network", CONFIG_SAVEDIR);
+	blobmsg_add_string(buf, "delta", format_file_stamp(path));
+
+	/* external device types add their own config params */
+	t = blobmsg_open_table(buf, "extdev");
+	snprintf(path, sizeof(path), "%s/extdev-config/*.json", main_path);
+	if (!glob(path, 0, NULL, &g)) {
+		for (i = 0; i < g.gl_pathc; i++)
+			blobmsg_add_string(buf, g.gl_pathv[i],
+					   format_file_stamp(g.gl_pathv[i]));
+		globfree(&g);
+	}
+	blobmsg_close_table(buf, t);
+
+	t = blobmsg_open_table(buf, "proto");
+	proto_dump_handlers(buf);
+	blobmsg_close_table(buf, t);
+
+	blobmsg_close_table(buf, c);
+}
+
+static const char *
+config_snapshot_file(void)
+{
+	static char path[PATH_MAX];
+
+	if (!cache_path)
+		return NULL;
+
+	snprintf(path, sizeof(path), "%s/%s", cache_path, CONFIG_SNAPSHOT_FILE);
+	return path;
+}
+
+static bool
+config_snapshot_check(struct blob_attr *attr, bool name)
+{
+	struct blob_attr *cur;
+	bool table;
+	int rem;
+
+	if (!blobmsg_check_attr(attr, name))
+		return false;
+
+	if (blobmsg_type(attr) != BLOBMSG_TYPE_TABLE &&
+	    blobmsg_type(attr) != BLOBMSG_TYPE_ARRAY)
+		return true;
+
+	table = blobmsg_type(attr) == BLOBMSG_TYPE_TABLE;
+	blobmsg_for_each_attr(cur, attr, rem)
+		if (!config_snapshot_check(cur, table))
+			return false;
+
+	return true;
+}
+
+static void
+config_snapshot_release(void)
+{
+	snapshot_records = NULL;
+	if (!snapshot_map)
+		return;
+
+	munmap(snapshot_map, snapshot_map_len);
+	snapshot_map = NULL;
+}
+
+static bool
+config_snapshot_load(void)
+{
+	enum {
+		SNAPSHOT_STAMPS,
+		SNAPSHOT_RECORDS,
+		__SNAPSHOT_MAX
+	};
+	static const struct blobmsg_policy policy[__SNAPSHOT_MAX] = {
+		[SNAPSHOT_STAMPS] = { "stamps", BLOBMSG_TYPE_TABLE },
+		[SNAPSHOT_RECORDS] = { "records", BLOBMSG_TYPE_ARRAY },
+	};
+	struct blob_attr *tb[__SNAPSHOT_MAX];
+	struct config_snapshot_hdr *hdr;
+	struct blob_attr *head, *stamps;
+	const char *file;
+	struct stat st;
+	void *map;
+	int fd;
+
+	file = config_snapshot_file();
+	if (!file)
+		return false;
+
+	fd = open(file, O_RDONLY | O_CLOEXEC);
+	if (fd < 0)
+		return false;
+
+	if (fstat(fd, &st) < 0 ||
+	    st.st_size < (off_t) (sizeof(*hdr) + sizeof(struct blob_attr))) {
+		close(fd);
+		return false;
+	}
+
+	map = mmap(NULL, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+	close(fd);
+	if (map == MAP_FAILED)
+		return false;
+
+	snapshot_map = map;
+	snapshot_map_len = st.st_size;
+
+	hdr = map;
+	head = (struct blob_attr *) &hdr[1];
+	if (hdr->magic != CONFIG_SNAPSHOT_MAGIC ||
+	    hdr->version != CONFIG_SNAPSHOT_VERSION ||
+	    hdr->len != st.st_size - sizeof(*hdr) ||
+	    blob_raw_len(head) < sizeof(struct blob_attr) ||
+	    blob_pad_len(head) > hdr->len)
+		goto invalid;
+
+	blobmsg_parse(policy, __SNAPSHOT_MAX, tb, blob_data(head), blob_len(head));
+	if (!tb[SNAPSHOT_STAMPS] || !tb[SNAPSHOT_RECORDS])
+		goto invalid;
+
+	blob_buf_init(&b, 0);
+	config_snapshot_stamps(&b);
+	stamps = blob_data(b.head);
+	if (blob_pad_len(stamps) != blob_pad_len(tb[SNAPSHOT_STAMPS]) ||
+	    memcmp(stamps, tb[SNAPSHOT_STAMPS], blob_pad_len(stamps)) != 0) {
+		D(SYSTEM, "Network config snapshot %s is stale\n", file);
+		goto invalid;
+	}
+
+	if (!config_snapshot_check(tb[SNAPSHOT_RECORDS], true))
+		goto invalid;
+
+	snapshot_records = tb[SNAPSHOT_RECORDS];
+	netifd_log_message(L_INFO, "Using network config snapshot %s\n", file);
+	return true;
+
+invalid:
+	config_snapshot_release();
+	return false;
+}
+
+/* the stamps are taken before the package is loaded, a later change is not missed */
+static void
+config_snapshot_start(void)
+{
+	if (!config_snapshot_file())
+		return;
+
+	blob_buf_init(&snapshot, 0);
+	config_snapshot_stamps(&snapshot);
+	snapshot_list = blobmsg_open_array(&snapshot, "records");
+	snapshot_recording = true;
+}
+
+static void
+config_snapshot_save(void)
+{
+	struct config_snapshot_hdr hdr = {
+		.magic = CONFIG_SNAPSHOT_MAGIC,
+		.version = CONFIG_SNAPSHOT_VERSION,
+	};
+	char tmppath[PATH_MAX];
+	const char *file;
+	bool ok;
+	FILE *f;
+
+	if (!snapshot_recording)
+		return;
+
+	snapshot_recording = false;
+	blobmsg_close_array(&snapshot, snapshot_list);
+	hdr.len = blob_pad_len(snapshot.head);
+
+	file = config_snapshot_file();
+	snprintf(tmppath, sizeof(tmppath), "%s.tmp", file);
+	if (mkdir_p(cache_path, 0755) < 0)
+		goto error;
+
+	f = fopen(tmppath, "w");
+	if (!f)
+		goto error;
+
+	ok = fwrite(&hdr, sizeof(hdr), 1, f) == 1 &&
+	     fwrite(snapshot.head, hdr.len, 1, f) == 1;
+	if (fclose(f) || !ok || rename(tmppath, file) < 0)
+		goto error;
+
+	blob_buf_free(&snapshot);
+	return;
+
+error:
+	D(SYSTEM, "Failed to write network config snapshot %s\n", file);
+	unlink(tmppath);
+	blob_buf_free(&snapshot);
+}
+
+static int
+__config_init_all(void)
 {
 	int ret = 0;
 	char *err;
 
-	uci_network = config_init_package("network");
-	if (!uci_network) {
-		uci_get_errorstr(uci_ctx, &err, NULL);
-		netifd_log_message(L_CRIT, "Failed to load network config (%s)\n", err);
-		free(err);
-		return -1;
+	if (!config_snapshot_load()) {
+		config_snapshot_start();
+		uci_network = config_init_package("network");
+		if (!uci_network) {
+			snapshot_recording = false;
+			blob_buf_free(&snapshot);
+			uci_get_errorstr(uci_ctx, &err, NULL);
+			netifd_log_message(L_CRIT, "Failed to load network config (%s)\n", err);
+			free(err);
+			return -1;
+		}
 	}
 
 	uci_wireless = config_init_package("wireless");
@@ -784,6 +1317,8 @@ config_init_all(void)
 	config_init_ip();
 	config_init_rules();
 	config_init_globals();
+	config_snapshot_save();
+	config_snapshot_release();
 	config_init_wireless();
 
 	config_init = false;
@@ -797,3 +1332,15 @@ config_init_all(void)
 
 	return ret;
 }
+
+int
+config_init_all(void)
+{
+	uint64_t start = netifd_stat_start();
+	int ret;
+
+	ret = __config_init_all();
+	netifd_stat_stop(NETIFD_STAT_CONFIG_INIT, start);
+
+	return ret;
+}
@@ -30,6 +30,10 @@
 static struct list_head devtypes = LIST_HEAD_INIT(devtypes);
 static struct avl_tree devices;
 
+/* candidates for the next unused/pending pass, only devices in the tree */
+static struct list_head unused_devices = LIST_HEAD_INIT(unused_devices);
+static struct list_head pending_devices = LIST_HEAD_INIT(pending_devices);
+
 static const struct blobmsg_policy dev_attrs[__DEV_ATTR_MAX] = {
 	[DEV_ATTR_TYPE] = { .name = "type", .type = BLOBMSG_TYPE_STRING },
 	[DEV_ATTR_MTU] = { .name = "mtu", .type = BLOBMSG_TYPE_INT32 },
@@ -637,6 +641,8 @@ int device_init_virtual(struct device *dev, struct device_type *type, const char
 	D(DEVICE, "Initialize device '%s'\n", name ? name : "");
 	INIT_SAFE_LIST(&dev->users);
 	INIT_SAFE_LIST(&dev->aliases);
+	INIT_LIST_HEAD(&dev->unused_list);
+	INIT_LIST_HEAD(&dev->pending_list);
 	dev->type = type;
 
 	if (name) {
@@ -667,6 +673,8 @@ int device_init(struct device *dev, struct device_type *type, const char *ifname
 	if (ret < 0)
 		return ret;
 
+	/* freed by the next unused pass unless it gets a user or config */
+	list_add_tail(&dev->unused_list, &unused_devices);
 	system_if_clear_state(dev);
 
 	return 0;
@@ -748,6 +756,8 @@ device_delete(struct device *dev)
 	D(DEVICE, "Delete device '%s' from list\n", dev->ifname);
 	avl_delete(&devices, &dev->avl);
 	dev->avl.key = NULL;
+	list_del_init(&dev->unused_list);
+	list_del_init(&dev->pending_list);
 }
 
 static int device_cleanup_cb(void *ctx, struct safe_list *list)
@@ -929,12 +939,25 @@ device_free(struct device *dev)
 	__devlock--;
 }
 
+static void
+device_queue_unused(struct device *dev)
+{
+	if (!dev->avl.key || !list_empty(&dev->unused_list))
+		return;
+
+	list_add_tail(&dev->unused_list, &unused_devices);
+}
+
 static void
 __device_free_unused(struct uloop_timeout *timeout)
 {
-	struct device *dev, *tmp;
+	struct device *dev;
+
+	/* freeing a device can drop the last user of another one */
+	while (!list_empty(&unused_devices)) {
+		dev = list_first_entry(&unused_devices, struct device, unused_list);
+		list_del_init(&dev->unused_list);
 
-	avl_for_each_element_safe(&devices, dev, avl, tmp) {
 		if (!safe_list_empty(&dev->users) ||
 			!safe_list_empty(&dev->aliases) ||
 			dev->current_config)
@@ -967,20 +990,30 @@ void device_remove_user(struct device_user *dep)
 	safe_list_del(&dep->list);
 	dep->dev = NULL;
 	D(DEVICE, "Remove user for device '%s', refcount=%d\n", dev->ifname, device_refcount(dev));
+	device_queue_unused(dev);
 	device_free_unused();
 }
 
 void
-device_init_pending(void)
+device_set_config_pending(struct device *dev, bool pending)
 {
-	struct device *dev, *tmp;
+	dev->config_pending = pending;
 
-	avl_for_each_element_safe(&devices, dev, avl, tmp) {
-		if (!dev->config_pending)
-			continue;
+	if (!pending)
+		list_del_init(&dev->pending_list);
+	else if (dev->avl.key && list_empty(&dev->pending_list))
+		list_add_tail(&dev->pending_list, &pending_devices);
+}
+
+void
+device_init_pending(void)
+{
+	struct device *dev;
 
+	while (!list_empty(&pending_devices)) {
+		dev = list_first_entry(&pending_devices, struct device, pending_list);
 		dev->type->config_init(dev);
-		dev->config_pending = false;
+		device_set_config_pending(dev, false);
 		device_check_state(dev);
 	}
 }
@@ -1102,6 +1135,9 @@ device_reset_old(void)
 	struct device *dev, *tmp, *ndev;
 
 	avl_for_each_element_safe(&devices, dev, avl, tmp) {
+		if (!dev->current_config)
+			device_queue_unused(dev);
+
 		if (dev->current_config || dev->default_config)
 			continue;
 
@@ -1153,7 +1189,7 @@ device_create(const char *name, struct device_type *type,
 
 	if (!config_init && dev->config_pending) {
 		type->config_init(dev);
-		dev->config_pending = false;
+		device_set_config_pending(dev, false);
 	}
 
 	device_check_state(dev);
@@ -231,6 +231,9 @@ struct device {
 	struct safe_list users;
 	struct safe_list aliases;
 
+	struct list_head unused_list;
+	struct list_head pending_list;
+
 	struct vlist_tree vlans;
 	struct kvlist vlan_aliases;
 
@@ -324,6 +327,7 @@ struct device *device_create(const char *name, struct device_type *type,
 			     struct blob_attr *config);
 void device_merge_settings(struct device *dev, struct device_settings *n);
 void device_init_settings(struct device *dev, struct blob_attr **tb);
+void device_set_config_pending(struct device *dev, bool pending);
 void device_init_pending(void);
 
 enum dev_change_type
@@ -27,6 +27,7 @@ proto_ppp_teardown() {
 add_protocol ppp
 
 proto_pppoe_init_config() {
+	persistent_worker=1
 	ppp_generic_init_config
 }
 
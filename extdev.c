@@ -857,7 +857,7 @@ __bridge_reload(struct extdev_bridge *ebr, struct blob_attr *config)
 	}
 
 	__bridge_config_init(ebr);
-	ebr->edev.dev.config_pending = false;
+	device_set_config_pending(&ebr->edev.dev, false);
 	uloop_timeout_cancel(&ebr->edev.retry);
 
 	return change;
@@ -935,7 +935,7 @@ __create(const char *name, struct device_type *type, struct blob_attr *config)
 	if (ret)
 		goto inv_error;
 
-	edev->dev.config_pending = false;
+	device_set_config_pending(&edev->dev, false);
 
 	return &edev->dev;
 
@@ -965,7 +965,7 @@ __bridge_create(const char *name, struct device_type *devtype, struct blob_attr
 		return NULL;
 
 	device_init(&ebr->edev.dev, devtype, name);
-	ebr->edev.dev.config_pending = true;
+	device_set_config_pending(&ebr->edev.dev, true);
 	ebr->retry.cb = extdev_bridge_retry_enable_members;
 	ebr->edev.etype = container_of(devtype, struct extdev_type, handler);
 	ebr->set_state = ebr->edev.dev.set_state;
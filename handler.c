@@ -13,9 +13,12 @@
  */
 
 #define _GNU_SOURCE
+#include <sys/stat.h>
+#include <limits.h>
 #include <glob.h>
 #include <fcntl.h>
 #include <stdio.h>
+#include <string.h>
 
 #include "netifd.h"
 #include "system.h"
@@ -137,24 +140,40 @@ field_missing:
 			       "missing field '%s'\n", config_file, err_missing);
 }
 
-static void
-netifd_parse_script_handler(const char *name, script_dump_cb cb)
-{
-	struct json_tokener *tok = NULL;
-	json_object *obj;
-	static char buf[512];
-	char *start, *cmd;
+#define HANDLER_CACHE_VERSION	1
+
+struct script_dump {
+	const char *name;
+	char *key;
 	FILE *f;
-	int len;
+	json_object *entry;
+	bool pending;
+};
+
+static json_object *handler_cache;
+static bool handler_cache_dirty;
+
+static FILE *
+netifd_start_script_dump(const char *name)
+{
+	char *cmd;
 
 #define DUMP_SUFFIX	" '' dump"
 
 	cmd = alloca(strlen(name) + 1 + sizeof(DUMP_SUFFIX));
 	sprintf(cmd, "%s" DUMP_SUFFIX, name);
 
-	f = popen(cmd, "r");
-	if (!f)
-		return;
+	return popen(cmd, "r");
+}
+
+static void
+netifd_read_script_dump(FILE *f, json_object *dump)
+{
+	struct json_tokener *tok = NULL;
+	json_object *obj;
+	static char buf[512];
+	char *start;
+	int len;
 
 	do {
 		start = fgets(buf, sizeof(buf), f);
@@ -168,8 +187,7 @@ netifd_parse_script_handler(const char *name, script_dump_cb cb)
 
 		obj = json_tokener_parse_ex(tok, start, len);
 		if (obj) {
-			netifd_init_script_handler(name, obj, cb);
-			json_object_put(obj);
+			json_object_array_add(dump, obj);
 			json_tokener_free(tok);
 			tok = NULL;
 		} else if (start[len - 1] == '\n') {
@@ -184,6 +202,195 @@ netifd_parse_script_handler(const char *name, script_dump_cb cb)
 	pclose(f);
 }
 
+static const char *
+netifd_handler_cache_file(void)
+{
+	static char path[PATH_MAX];
+
+	if (!cache_path || !*cache_path)
+		return NULL;
+
+	snprintf(path, sizeof(path), "%s/handlers.json", cache_path);
+	return path;
+}
+
+/*
+ * A dump also depends on the netifd build and on the shell libraries in
+ * the main path the handlers source, e.g. netifd-proto.sh. A change of
+ * either drops all cached dumps.
+ */
+static json_object *
+netifd_handler_cache_stamps(void)
+{
+	json_object *stamps;
+	char path[PATH_MAX];
+	glob_t g;
+	size_t i;
+
+	stamps = json_object_new_object();
+	json_object_object_add(stamps, "netifd",
+			       json_object_new_string(format_file_stamp("/proc/self/exe")));
+
+	snprintf(path, sizeof(path), "%s/*.sh", main_path);
+	if (glob(path, 0, NULL, &g))
+		return stamps;
+
+	for (i = 0; i < g.gl_pathc; i++)
+		json_object_object_add(stamps, g.gl_pathv[i],
+				       json_object_new_string(format_file_stamp(g.gl_pathv[i])));
+	globfree(&g);
+
+	return stamps;
+}
+
+static json_object *
+netifd_handler_cache_scripts(void)
+{
+	json_object *stamps, *tmp;
+	const char *file;
+
+	if (handler_cache)
+		goto out;
+
+	stamps = netifd_handler_cache_stamps();
+	file = netifd_handler_cache_file();
+	if (file)
+		handler_cache = json_object_from_file(file);
+
+	if (handler_cache) {
+		tmp = json_get_field(handler_cache, "version", json_type_int);
+		if (!tmp || json_object_get_int(tmp) != HANDLER_CACHE_VERSION ||
+		    !json_object_equal(json_get_field(handler_cache, "stamps", json_type_object), stamps) ||
+		    !json_get_field(handler_cache, "scripts", json_type_object)) {
+			json_object_put(handler_cache);
+			handler_cache = NULL;
+		}
+	}
+
+	if (!handler_cache) {
+		handler_cache = json_object_new_object();
+		json_object_object_add(handler_cache, "version",
+				       json_object_new_int(HANDLER_CACHE_VERSION));
+		json_object_object_add(handler_cache, "stamps", json_object_get(stamps));
+		json_object_object_add(handler_cache, "scripts", json_object_new_object());
+		handler_cache_dirty = true;
+	}
+	json_object_put(stamps);
+
+out:
+	return json_get_field(handler_cache, "scripts", json_type_object);
+}
+
+static void
+netifd_handler_cache_save(void)
+{
+	char tmppath[PATH_MAX];
+	const char *file;
+
+	if (!handler_cache_dirty)
+		return;
+
+	handler_cache_dirty = false;
+	file = netifd_handler_cache_file();
+	if (!file)
+		return;
+
+	snprintf(tmppath, sizeof(tmppath), "%s.tmp", file);
+	if (mkdir_p(cache_path, 0755) < 0 ||
+	    json_object_to_file_ext(tmppath, handler_cache, JSON_C_TO_STRING_PLAIN) < 0 ||
+	    rename(tmppath, file) < 0) {
+		D(SYSTEM, "Failed to write handler cache %s\n", file);
+		unlink(tmppath);
+	}
+}
+
+static json_object *
+netifd_handler_cache_entry(const char *name)
+{
+	json_object *entry;
+	struct stat st;
+	uint32_t crc;
+	FILE *f;
+
+	if (!netifd_handler_cache_file())
+		return NULL;
+
+	f = fopen(name, "r");
+	if (!f)
+		return NULL;
+
+	if (fstat(fileno(f), &st) < 0) {
+		fclose(f);
+		return NULL;
+	}
+
+	crc = crc32_file(f);
+	fclose(f);
+
+	entry = json_object_new_object();
+	json_object_object_add(entry, "mtime", json_object_new_int64(st.st_mtime));
+	json_object_object_add(entry, "size", json_object_new_int64(st.st_size));
+	json_object_object_add(entry, "crc32", json_object_new_int64(crc));
+
+	return entry;
+}
+
+static bool
+netifd_handler_cache_match(json_object *cached, json_object *entry)
+{
+	static const char * const fields[] = { "mtime", "size", "crc32" };
+	json_object *v1, *v2;
+	int i;
+
+	if (!cached || !json_get_field(cached, "dump", json_type_array))
+		return false;
+
+	for (i = 0; i < ARRAY_SIZE(fields); i++) {
+		v1 = json_get_field(cached, fields[i], json_type_int);
+		v2 = json_get_field(entry, fields[i], json_type_int);
+		if (!v1 || !v2 || json_object_get_int64(v1) != json_object_get_int64(v2))
+			return false;
+	}
+
+	return true;
+}
+
+static void
+netifd_handler_cache_prune(json_object *scripts, const char *dir,
+			   struct script_dump *dumps, int n_dumps)
+{
+	const char **stale;
+	int i, n_stale = 0;
+	size_t len = strlen(dir);
+
+	stale = calloc(json_object_object_length(scripts), sizeof(*stale));
+	if (!stale)
+		return;
+
+	json_object_object_foreach(scripts, key, val) {
+		(void) val;
+
+		if (strncmp(key, dir, len) != 0 || key[len] != '/' ||
+		    strchr(key + len + 1, '/'))
+			continue;
+
+		for (i = 0; i < n_dumps; i++)
+			if (dumps[i].key && !strcmp(dumps[i].key, key))
+				break;
+
+		if (i == n_dumps)
+			stale[n_stale++] = key;
+	}
+
+	for (i = 0; i < n_stale; i++)
+		json_object_object_del(scripts, stale[i]);
+
+	if (n_stale)
+		handler_cache_dirty = true;
+
+	free(stale);
+}
+
 static void
 netifd_parse_extdev_handler(const char *path_to_file, create_extdev_handler_cb cb)
 {
@@ -226,22 +433,106 @@ netifd_parse_extdev_handler(const char *path_to_file, create_extdev_handler_cb c
 	fclose(file);
 }
 
+/*
+ * Handler scripts describe themselves when called with "'' dump".
+ * The parsed output is cached per script in <cache_path>/handlers.json,
+ * keyed by mtime, size and crc32 of the script, so only new or changed
+ * scripts have to be run. Up to dump_jobs of those run in parallel,
+ * they are started ahead of the one that is read.
+ */
 void netifd_init_script_handlers(int dir_fd, script_dump_cb cb)
 {
+	struct script_dump *dumps;
+	json_object *scripts, *dump, *obj;
+	char dir[PATH_MAX];
+	unsigned int running = 0;
 	glob_t g;
-	int i, prev_fd;
+	int i, j, next, prev_fd;
 
+	/* the cache and main path may be relative to the start dir */
+	scripts = netifd_handler_cache_scripts();
 	prev_fd = netifd_dir_push(dir_fd);
 	if (glob("./*.sh", 0, NULL, &g)) {
 		netifd_dir_pop(prev_fd);
 		return;
 	}
 
-	for (i = 0; i < g.gl_pathc; i++)
-		netifd_parse_script_handler(g.gl_pathv[i], cb);
-	netifd_dir_pop(prev_fd);
+	dumps = calloc(g.gl_pathc, sizeof(*dumps));
+	if (!dumps)
+		goto out;
+
+	if (!getcwd(dir, sizeof(dir)))
+		dir[0] = 0;
+
+	for (i = 0; i < g.gl_pathc; i++) {
+		struct script_dump *d = &dumps[i];
+		const char *name = g.gl_pathv[i];
+		json_object *cached = NULL;
+
+		d->name = name;
+		d->entry = netifd_handler_cache_entry(name);
+		if (d->entry && dir[0] &&
+		    asprintf(&d->key, "%s/%s", dir, basename(name)) < 0)
+			d->key = NULL;
+
+		if (d->key)
+			json_object_object_get_ex(scripts, d->key, &cached);
+
+		if (d->entry && netifd_handler_cache_match(cached, d->entry)) {
+			json_object_put(d->entry);
+			d->entry = json_object_get(cached);
+			continue;
+		}
+
+		if (!d->entry)
+			d->entry = json_object_new_object();
 
+		json_object_object_add(d->entry, "dump", json_object_new_array());
+		d->pending = true;
+	}
+
+	for (i = 0, next = 0; i < g.gl_pathc; i++) {
+		struct script_dump *d = &dumps[i];
+
+		/* dumps before i were read already, running only counts those ahead */
+		for (; next < g.gl_pathc && running < dump_jobs; next++) {
+			if (!dumps[next].pending)
+				continue;
+
+			dumps[next].f = netifd_start_script_dump(dumps[next].name);
+			if (dumps[next].f)
+				running++;
+		}
+
+		dump = json_get_field(d->entry, "dump", json_type_array);
+		if (d->f) {
+			netifd_read_script_dump(d->f, dump);
+			running--;
+			if (d->key) {
+				json_object_object_add(scripts, d->key, json_object_get(d->entry));
+				handler_cache_dirty = true;
+			}
+		}
+
+		for (j = 0; j < json_object_array_length(dump); j++) {
+			obj = json_object_array_get_idx(dump, j);
+			netifd_init_script_handler(d->name, obj, cb);
+		}
+	}
+
+	if (dir[0])
+		netifd_handler_cache_prune(scripts, dir, dumps, g.gl_pathc);
+
+	for (i = 0; i < g.gl_pathc; i++) {
+		json_object_put(dumps[i].entry);
+		free(dumps[i].key);
+	}
+	free(dumps);
+
+out:
+	netifd_dir_pop(prev_fd);
 	globfree(&g);
+	netifd_handler_cache_save();
 }
 
 void
@@ -830,7 +830,7 @@ __interface_update_route(struct interface_ip_settings *ip,
 	struct interface *iface = ip->iface;
 	struct device *dev;
 	struct device_route *route_old, *route_new;
-	bool keep = false;
+	bool keep = false, replace = false;
 
 	dev = iface->l3_dev.dev;
 
@@ -840,13 +840,25 @@ __interface_update_route(struct interface_ip_settings *ip,
 	route_old = container_of(node_old, struct device_route, node);
 	route_new = container_of(node_new, struct device_route, node);
 
-	if (node_old && node_new)
+	if (node_old && node_new) {
 		keep = !memcmp(&route_old->nexthop, &route_new->nexthop, sizeof(route_old->nexthop)) &&
 			(route_old->mtu == route_new->mtu) && (route_old->type == route_new->type) &&
 			(route_old->proto == route_new->proto) && !route_old->failed;
 
+		/*
+		 * Both routes share the same key and therefore the same kernel
+		 * FIB entry. Let system_add_route replace it in place instead of
+		 * deleting it first, so traffic is not dropped in between.
+		 * A type change may move the route to another table, so it
+		 * still takes the delete path.
+		 */
+		replace = !keep && route_old->enabled &&
+			(route_old->type == route_new->type) &&
+			enable_route(ip, route_new);
+	}
+
 	if (node_old) {
-		if (!(route_old->flags & DEVADDR_EXTERNAL) && route_old->enabled && !keep)
+		if (!(route_old->flags & DEVADDR_EXTERNAL) && route_old->enabled && !keep && !replace)
 			system_del_route(dev, route_old);
 
 		free(route_old);
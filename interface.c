@@ -25,6 +25,7 @@
 #include "ubus.h"
 #include "config.h"
 #include "system.h"
+#include "stats.h"
 
 struct vlist_tree interfaces;
 static LIST_HEAD(iface_all_users);
@@ -1393,6 +1394,7 @@ interface_update(struct vlist_tree *tree, struct vlist_node *node_new,
 {
 	struct interface *if_old = container_of(node_old, struct interface, node);
 	struct interface *if_new = container_of(node_new, struct interface, node);
+	uint64_t start = netifd_stat_start();
 
 	if (node_old && node_new) {
 		D(INTERFACE, "Update interface '%s'\n", if_new->name);
@@ -1407,6 +1409,8 @@ interface_update(struct vlist_tree *tree, struct vlist_node *node_new,
 		interface_claim_device(if_new);
 		netifd_ubus_add_interface(if_new);
 	}
+
+	netifd_stat_stop(NETIFD_STAT_INTERFACE_UPDATE, start);
 }
 
 
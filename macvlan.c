@@ -240,7 +240,7 @@ macvlan_create(const char *name, struct device_type *devtype,
 		return NULL;
 	}
 
-	dev->config_pending = true;
+	device_set_config_pending(dev, true);
 
 	mvdev->set_state = dev->set_state;
 	dev->set_state = macvlan_set_state;
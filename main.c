@@ -32,6 +32,8 @@ unsigned int debug_mask = 0;
 const char *main_path = DEFAULT_MAIN_PATH;
 const char *config_path = DEFAULT_CONFIG_PATH;
 const char *resolv_conf = DEFAULT_RESOLV_CONF;
+const char *cache_path = DEFAULT_CACHE_PATH;
+unsigned int dump_jobs = DEFAULT_DUMP_JOBS;
 static char **global_argv;
 
 static struct list_head process_list = LIST_HEAD_INIT(process_list);
@@ -211,6 +213,9 @@ static void netifd_do_restart(struct uloop_timeout *timeout)
 
 int netifd_reload(void)
 {
+#ifdef ENABLE_PROTO_SHELL
+	proto_shell_reload();
+#endif
 	return config_init_all();
 }
 
@@ -236,8 +241,11 @@ static int usage(const char *progname)
 		"			(default: "DEFAULT_HOTPLUG_PATH")\n"
 		" -r <path>:		Path to resolv.conf\n"
 		" -l <level>:		Log output level (default: %d)\n"
+		" -C <path>:		Path to the directory for startup caches,\n"
+		"			empty to disable (default: "DEFAULT_CACHE_PATH")\n"
+		" -j <jobs>:		Handler scripts to dump at once (default: %d)\n"
 		" -S:			Use stderr instead of syslog for log messages\n"
-		"\n", progname, main_path, DEFAULT_LOG_LEVEL);
+		"\n", progname, main_path, DEFAULT_LOG_LEVEL, DEFAULT_DUMP_JOBS);
 
 	return 1;
 }
@@ -265,6 +273,18 @@ netifd_setup_signals(void)
 	sigaction(SIGPIPE, &s, NULL);
 }
 
+unsigned int
+netifd_process_count(void)
+{
+	struct netifd_process *proc;
+	unsigned int count = 0;
+
+	list_for_each_entry(proc, &process_list, list)
+		count++;
+
+	return count;
+}
+
 static void
 netifd_kill_processes(void)
 {
@@ -281,7 +301,7 @@ int main(int argc, char **argv)
 
 	global_argv = argv;
 
-	while ((ch = getopt(argc, argv, "d:s:p:c:h:r:l:S")) != -1) {
+	while ((ch = getopt(argc, argv, "d:s:p:c:h:r:l:C:j:S")) != -1) {
 		switch(ch) {
 		case 'd':
 			debug_mask = strtoul(optarg, NULL, 0);
@@ -306,6 +326,14 @@ int main(int argc, char **argv)
 			if (log_level >= ARRAY_SIZE(log_class))
 				log_level = ARRAY_SIZE(log_class) - 1;
 			break;
+		case 'C':
+			cache_path = optarg;
+			break;
+		case 'j':
+			dump_jobs = strtoul(optarg, NULL, 0);
+			if (!dump_jobs)
+				dump_jobs = 1;
+			break;
 #ifndef DUMMY_MODE
 		case 'S':
 			use_syslog = false;
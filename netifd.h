@@ -40,14 +40,18 @@
 #define DEFAULT_HOTPLUG_PATH	"./examples/hotplug-cmd"
 #define DEFAULT_RESOLV_CONF	"./tmp/resolv.conf"
 #define DEFAULT_BOARD_JSON	"./config/board.json"
+#define DEFAULT_CACHE_PATH	"./tmp/cache"
 #else
 #define DEFAULT_MAIN_PATH	"/lib/netifd"
 #define DEFAULT_CONFIG_PATH	NULL /* use the default set in libuci */
 #define DEFAULT_HOTPLUG_PATH	"/sbin/hotplug-call"
 #define DEFAULT_RESOLV_CONF	"/tmp/resolv.conf.d/resolv.conf.auto"
 #define DEFAULT_BOARD_JSON	"/etc/board.json"
+#define DEFAULT_CACHE_PATH	"/etc/netifd/cache"
 #endif
 
+#define DEFAULT_DUMP_JOBS	4
+
 extern const char *resolv_conf;
 extern char *hotplug_cmd_path;
 extern unsigned int debug_mask;
@@ -99,12 +103,15 @@ void netifd_log_message(int priority, const char *format, ...);
 
 int netifd_start_process(const char **argv, char **env, struct netifd_process *proc);
 void netifd_kill_process(struct netifd_process *proc);
+unsigned int netifd_process_count(void);
 
 struct device;
 struct interface;
 
 extern const char *main_path;
 extern const char *config_path;
+extern const char *cache_path;
+extern unsigned int dump_jobs;
 void netifd_restart(void);
 int netifd_reload(void);
 
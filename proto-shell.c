@@ -13,10 +13,15 @@
  */
 #define _GNU_SOURCE
 
+#include <sys/stat.h>
 #include <string.h>
 #include <stdlib.h>
 #include <stdio.h>
+#include <limits.h>
 #include <signal.h>
+#include <errno.h>
+#include <fcntl.h>
+#include <unistd.h>
 
 #include <arpa/inet.h>
 #include <netinet/in.h>
@@ -30,6 +35,17 @@
 #include "handler.h"
 
 static int proto_fd = -1;
+static LIST_HEAD(workers);
+
+/*
+ * A persistent worker sources the handler script once and then reads
+ * requests from stdin, one per line:
+ *   <id> <proto> <action> <interface> <ifname|-> <error|-> <config>
+ * (tab separated). Every request runs in its own subshell, the worker
+ * reports "<id> start <pid>" and "<id> done <status>" on fd 3 and
+ * prefixes each line of its output with "<id> ".
+ */
+#define PROTO_WORKER_CMD	"set -- '' worker; . \"$0\"; _proto_worker_loop"
 
 enum proto_shell_sm {
 	S_IDLE,
@@ -44,10 +60,29 @@ struct proto_shell_handler {
 	char *config_buf;
 	char *script_name;
 	bool init_available;
+	bool persistent_worker;
 
+	struct proto_shell_worker *worker;
 	struct uci_blob_param_list config;
 };
 
+struct proto_shell_worker {
+	struct list_head list;
+	struct proto_shell_handler *handler;
+	struct uloop_process proc;
+
+	struct ustream_fd log;
+	struct ustream_fd resp;
+	bool log_overflow;
+	int req_fd;
+
+	/* the script as it was sourced, a changed one needs a new worker */
+	struct stat script;
+	bool retired;
+
+	struct list_head requests;
+};
+
 struct proto_shell_dependency {
 	struct list_head list;
 
@@ -80,6 +115,14 @@ struct proto_shell_state {
 	struct netifd_process script_task;
 	struct netifd_process proto_task;
 
+	/* script_task replacement while the action runs in the handler worker */
+	struct proto_shell_worker *worker;
+	struct list_head worker_list;
+	unsigned int worker_id;
+	int worker_pid;
+	int worker_signal;
+	bool worker_pending;
+
 	enum proto_shell_sm sm;
 	bool proto_task_killed;
 	bool renew_pending;
@@ -154,6 +197,434 @@ proto_shell_clear_host_dep(struct proto_shell_state *state)
 	}
 }
 
+static void
+proto_shell_task_finish(struct proto_shell_state *state,
+			struct netifd_process *task);
+
+static bool
+proto_shell_script_pending(struct proto_shell_state *state)
+{
+	return state->script_task.uloop.pending || state->worker_pending;
+}
+
+static void
+proto_shell_script_signal(struct proto_shell_state *state, int sig)
+{
+	if (state->script_task.uloop.pending)
+		kill(state->script_task.uloop.pid, sig);
+	else if (state->worker_pid > 0)
+		kill(state->worker_pid, sig);
+	else if (state->worker_pending)
+		state->worker_signal = sig;
+}
+
+static void
+proto_shell_worker_close(struct proto_shell_worker *worker)
+{
+	/* the worker loop ends on EOF */
+	if (worker->req_fd < 0)
+		return;
+
+	close(worker->req_fd);
+	worker->req_fd = -1;
+}
+
+static void
+proto_shell_worker_retire(struct proto_shell_worker *worker)
+{
+	if (worker->handler->worker == worker)
+		worker->handler->worker = NULL;
+
+	/* requests in flight still report to it, it exits after the last one */
+	worker->retired = true;
+	if (list_empty(&worker->requests))
+		proto_shell_worker_close(worker);
+}
+
+static void
+proto_shell_worker_request_done(struct proto_shell_state *state)
+{
+	struct proto_shell_worker *worker = state->worker;
+
+	list_del(&state->worker_list);
+	state->worker = NULL;
+	state->worker_pending = false;
+	state->worker_pid = 0;
+	state->worker_signal = 0;
+
+	if (worker && worker->retired && list_empty(&worker->requests))
+		proto_shell_worker_close(worker);
+}
+
+static void
+proto_shell_script_kill(struct proto_shell_state *state)
+{
+	netifd_kill_process(&state->script_task);
+
+	if (!state->worker_pending)
+		return;
+
+	/* not started yet: it gets killed as soon as its start is reported */
+	if (state->worker_pid > 0)
+		kill(state->worker_pid, SIGKILL);
+
+	proto_shell_worker_request_done(state);
+}
+
+static struct proto_shell_state *
+proto_shell_worker_find(struct proto_shell_worker *worker, unsigned int id)
+{
+	struct proto_shell_state *state;
+
+	list_for_each_entry(state, &worker->requests, worker_list)
+		if (state->worker_id == id)
+			return state;
+
+	return NULL;
+}
+
+static void
+proto_shell_worker_response(struct proto_shell_worker *worker, const char *line)
+{
+	struct proto_shell_state *state;
+	unsigned int id;
+	char type[8];
+	int val;
+
+	if (sscanf(line, "%u %7s %d", &id, type, &val) != 3)
+		return;
+
+	state = proto_shell_worker_find(worker, id);
+
+	if (!strcmp(type, "start")) {
+		if (val <= 0)
+			return;
+
+		if (!state) {
+			kill(val, SIGKILL);
+			return;
+		}
+
+		state->worker_pid = val;
+		if (state->worker_signal)
+			kill(val, state->worker_signal);
+	} else if (!strcmp(type, "done") && state) {
+		/* the output was written before, log it while the id is known */
+		while (ustream_poll(&worker->log.stream));
+		proto_shell_worker_request_done(state);
+		proto_shell_task_finish(state, &state->script_task);
+	}
+}
+
+static void
+proto_shell_worker_resp_cb(struct ustream *s, int bytes)
+{
+	struct proto_shell_worker *worker;
+	char *data, *newline;
+	int len;
+
+	worker = container_of(s, struct proto_shell_worker, resp.stream);
+
+	do {
+		data = ustream_get_read_buf(s, &len);
+		if (!len)
+			break;
+
+		newline = strchr(data, '\n');
+		if (!newline)
+			break;
+
+		*newline = 0;
+		proto_shell_worker_response(worker, data);
+		ustream_consume(s, newline + 1 - data);
+	} while (1);
+}
+
+static void
+proto_shell_worker_log(struct proto_shell_worker *worker, char *data, const char *suffix)
+{
+	struct proto_shell_state *state = NULL;
+	unsigned long id;
+	char *msg;
+
+	id = strtoul(data, &msg, 10);
+	if (msg != data && *msg == ' ') {
+		state = proto_shell_worker_find(worker, id);
+		data = msg + 1;
+	}
+
+	/* same format as the output of a plain script */
+	if (state)
+		netifd_log_message(L_NOTICE, "%s (%d): %s%s\n",
+			state->proto.iface->name,
+			state->worker_pid > 0 ? state->worker_pid : worker->proc.pid,
+			data, suffix);
+	else
+		netifd_log_message(L_NOTICE, "%s worker (%d): %s%s\n",
+			worker->handler->proto.name, worker->proc.pid, data, suffix);
+}
+
+static void
+proto_shell_worker_log_cb(struct ustream *s, int bytes)
+{
+	struct proto_shell_worker *worker;
+	char *data;
+	int len;
+
+	worker = container_of(s, struct proto_shell_worker, log.stream);
+
+	do {
+		char *newline;
+
+		data = ustream_get_read_buf(s, &len);
+		if (!len)
+			break;
+
+		newline = strchr(data, '\n');
+
+		if (worker->log_overflow) {
+			if (newline) {
+				len = newline + 1 - data;
+				worker->log_overflow = false;
+			}
+		} else if (newline) {
+			*newline = 0;
+			len = newline + 1 - data;
+			proto_shell_worker_log(worker, data, "");
+		} else if (len == s->r.buffer_len) {
+			proto_shell_worker_log(worker, data, " [...]");
+			worker->log_overflow = true;
+		} else
+			break;
+
+		ustream_consume(s, len);
+	} while (1);
+}
+
+static void
+proto_shell_worker_free(struct proto_shell_worker *worker)
+{
+	list_del(&worker->list);
+	while (ustream_poll(&worker->log.stream));
+	ustream_free(&worker->log.stream);
+	ustream_free(&worker->resp.stream);
+	close(worker->log.fd.fd);
+	close(worker->resp.fd.fd);
+	if (worker->req_fd >= 0)
+		close(worker->req_fd);
+	free(worker);
+}
+
+static void
+proto_shell_worker_cb(struct uloop_process *proc, int ret)
+{
+	struct proto_shell_worker *worker;
+	struct proto_shell_state *state;
+	LIST_HEAD(requests);
+
+	worker = container_of(proc, struct proto_shell_worker, proc);
+	if (WIFSIGNALED(ret))
+		netifd_log_message(L_WARNING, "%s worker (%d) killed by signal %d\n",
+			worker->handler->proto.name, proc->pid, WTERMSIG(ret));
+	else if (!worker->retired || WEXITSTATUS(ret))
+		netifd_log_message(L_WARNING, "%s worker (%d) exited with status %d\n",
+			worker->handler->proto.name, proc->pid, WEXITSTATUS(ret));
+	else
+		D(INTERFACE, "Retired %s worker (%d) exited\n",
+			worker->handler->proto.name, proc->pid);
+
+	/*
+	 * Detach the worker before picking up the completions it wrote
+	 * before it died: finishing a request can start the next action,
+	 * which has to go to a new worker instead of this one.
+	 */
+	if (worker->handler->worker == worker)
+		worker->handler->worker = NULL;
+	proto_shell_worker_close(worker);
+
+	while (ustream_poll(&worker->resp.stream));
+
+	list_splice_init(&worker->requests, &requests);
+	proto_shell_worker_free(worker);
+
+	/* the requests lost their reporter, finish them like exited scripts */
+	while (!list_empty(&requests)) {
+		state = list_first_entry(&requests, struct proto_shell_state, worker_list);
+		if (state->worker_pid > 0)
+			kill(state->worker_pid, SIGKILL);
+
+		state->worker = NULL;
+		proto_shell_worker_request_done(state);
+		proto_shell_task_finish(state, &state->script_task);
+	}
+}
+
+static bool
+proto_shell_worker_stale(struct proto_shell_worker *worker)
+{
+	struct stat st;
+
+	if (fstatat(proto_fd, worker->handler->script_name, &st, 0) < 0)
+		return false;
+
+	return st.st_ino != worker->script.st_ino ||
+	       st.st_size != worker->script.st_size ||
+	       st.st_mtim.tv_sec != worker->script.st_mtim.tv_sec ||
+	       st.st_mtim.tv_nsec != worker->script.st_mtim.tv_nsec;
+}
+
+static struct proto_shell_worker *
+proto_shell_worker_get(struct proto_shell_handler *handler)
+{
+	const char *argv[] = { "/bin/sh", "-c", PROTO_WORKER_CMD, handler->script_name, NULL };
+	struct proto_shell_worker *worker;
+	int req[2], resp[2], log[2];
+	int pid, i;
+
+	if (handler->worker) {
+		if (!proto_shell_worker_stale(handler->worker))
+			return handler->worker;
+
+		D(INTERFACE, "%s changed, restarting its worker\n", handler->script_name);
+		proto_shell_worker_retire(handler->worker);
+	}
+
+	worker = calloc(1, sizeof(*worker));
+	if (!worker)
+		return NULL;
+
+	if (fstatat(proto_fd, handler->script_name, &worker->script, 0) < 0)
+		goto free;
+
+	if (pipe(req) < 0)
+		goto free;
+
+	if (pipe(resp) < 0)
+		goto close_req;
+
+	if (pipe(log) < 0)
+		goto close_resp;
+
+	for (i = 0; i < 2; i++) {
+		system_fd_set_cloexec(req[i]);
+		system_fd_set_cloexec(resp[i]);
+		system_fd_set_cloexec(log[i]);
+	}
+
+	if ((pid = fork()) < 0)
+		goto close_log;
+
+	if (!pid) {
+		int fds[] = { req[0], log[1], log[1], resp[1] };
+
+		if (fchdir(proto_fd)) {}
+
+		/* dup2 clears close-on-exec, everything else is closed by exec */
+		for (i = 0; i < ARRAY_SIZE(fds); i++)
+			fds[i] = fcntl(fds[i], F_DUPFD_CLOEXEC, (int) ARRAY_SIZE(fds));
+
+		for (i = 0; i < ARRAY_SIZE(fds); i++)
+			dup2(fds[i], i);
+
+		execv(argv[0], (char **) argv);
+		exit(127);
+	}
+
+	close(req[0]);
+	close(resp[1]);
+	close(log[1]);
+
+	/* a full pipe must not block netifd, the request falls back to a plain script */
+	fcntl(req[1], F_SETFL, fcntl(req[1], F_GETFL) | O_NONBLOCK);
+
+	INIT_LIST_HEAD(&worker->requests);
+	list_add_tail(&worker->list, &workers);
+	worker->handler = handler;
+	worker->req_fd = req[1];
+	worker->proc.pid = pid;
+	worker->proc.cb = proto_shell_worker_cb;
+	uloop_process_add(&worker->proc);
+
+	worker->log.stream.string_data = true;
+	worker->log.stream.notify_read = proto_shell_worker_log_cb;
+	ustream_fd_init(&worker->log, log[0]);
+
+	worker->resp.stream.string_data = true;
+	worker->resp.stream.notify_read = proto_shell_worker_resp_cb;
+	ustream_fd_init(&worker->resp, resp[0]);
+
+	D(INTERFACE, "Started %s worker (%d)\n", handler->proto.name, pid);
+	handler->worker = worker;
+
+	return worker;
+
+close_log:
+	close(log[0]);
+	close(log[1]);
+close_resp:
+	close(resp[0]);
+	close(resp[1]);
+close_req:
+	close(req[0]);
+	close(req[1]);
+free:
+	free(worker);
+	return NULL;
+}
+
+static int
+proto_shell_worker_request(struct proto_shell_state *state, const char *action,
+			   const char *config, int error)
+{
+	struct proto_shell_handler *handler = state->handler;
+	struct interface *iface = state->proto.iface;
+	struct proto_shell_worker *worker;
+	static unsigned int worker_id;
+	char error_buf[16] = "-";
+	ssize_t ret;
+	char *buf;
+	int len;
+
+	worker = proto_shell_worker_get(handler);
+	if (!worker)
+		return -1;
+
+	if (error >= 0)
+		snprintf(error_buf, sizeof(error_buf), "%d", error);
+
+	len = asprintf(&buf, "%u\t%s\t%s\t%s\t%s\t%s\t%s\n",
+		       ++worker_id, handler->proto.name, action, iface->name,
+		       iface->main_dev.dev ? iface->main_dev.dev->ifname : "-",
+		       error_buf, config);
+	if (len < 0)
+		return -1;
+
+	/* only writes up to PIPE_BUF are atomic, a longer line could be split */
+	if (len > PIPE_BUF) {
+		free(buf);
+		return -1;
+	}
+
+	do {
+		ret = write(worker->req_fd, buf, len);
+	} while (ret < 0 && errno == EINTR);
+	free(buf);
+
+	if (ret < 0) {
+		/* the exit callback cleans up, fall back to a plain script */
+		if (errno != EAGAIN)
+			kill(worker->proc.pid, SIGKILL);
+		return -1;
+	}
+
+	state->worker = worker;
+	state->worker_id = worker_id;
+	state->worker_pending = true;
+	list_add_tail(&state->worker_list, &worker->requests);
+
+	return 0;
+}
+
 static int
 proto_shell_handler(struct interface_proto_state *proto,
 		    enum interface_proto_cmd cmd, bool force)
@@ -188,7 +659,7 @@ proto_shell_handler(struct interface_proto_state *proto,
 		if (!(handler->proto.flags & PROTO_FLAG_RENEW_AVAILABLE))
 			return 0;
 
-		if (state->script_task.uloop.pending) {
+		if (proto_shell_script_pending(state)) {
 			state->renew_pending = true;
 			return 0;
 		}
@@ -198,9 +669,9 @@ proto_shell_handler(struct interface_proto_state *proto,
 	} else {
 		switch (state->sm) {
 		case S_SETUP:
-			if (state->script_task.uloop.pending) {
+			if (proto_shell_script_pending(state)) {
 				uloop_timeout_set(&state->teardown_timeout, 1000);
-				kill(state->script_task.uloop.pid, SIGTERM);
+				proto_shell_script_signal(state, SIGTERM);
 				if (state->proto_task.uloop.pending)
 					kill(state->proto_task.uloop.pid, SIGTERM);
 				state->renew_pending = false;
@@ -243,7 +714,14 @@ proto_shell_handler(struct interface_proto_state *proto,
 	argv[i] = NULL;
 	envp[j] = NULL;
 
-	ret = netifd_start_process(argv, envp, proc);
+	proto_shell_script_kill(state);
+
+	ret = -1;
+	if (handler->persistent_worker)
+		ret = proto_shell_worker_request(state, action, config,
+						 j ? state->last_error : -1);
+	if (ret)
+		ret = netifd_start_process(argv, envp, proc);
 	free(config);
 
 	return ret;
@@ -317,7 +795,7 @@ proto_shell_task_finish(struct proto_shell_state *state,
 		break;
 
 	case S_SETUP_ABORT:
-		if (state->script_task.uloop.pending ||
+		if (proto_shell_script_pending(state) ||
 		    state->proto_task.uloop.pending)
 			break;
 
@@ -329,7 +807,7 @@ proto_shell_task_finish(struct proto_shell_state *state,
 		break;
 
 	case S_TEARDOWN:
-		if (state->script_task.uloop.pending)
+		if (proto_shell_script_pending(state))
 			break;
 
 		if (state->proto_task.uloop.pending) {
@@ -354,7 +832,7 @@ proto_shell_teardown_timeout_cb(struct uloop_timeout *timeout)
 
 	state = container_of(timeout, struct proto_shell_state, teardown_timeout);
 
-	netifd_kill_process(&state->script_task);
+	proto_shell_script_kill(state);
 	netifd_kill_process(&state->proto_task);
 	proto_shell_task_finish(state, NULL);
 }
@@ -390,7 +868,7 @@ proto_shell_free(struct interface_proto_state *proto)
 	uloop_timeout_cancel(&state->teardown_timeout);
 	uloop_timeout_cancel(&state->checkup_timeout);
 	proto_shell_clear_host_dep(state);
-	netifd_kill_process(&state->script_task);
+	proto_shell_script_kill(state);
 	netifd_kill_process(&state->proto_task);
 	free(state->config);
 	free(state);
@@ -932,6 +1410,10 @@ proto_shell_add_handler(const char *script, const char *name, json_object *obj)
 	if (tmp && json_object_get_boolean(tmp))
 		handler->proto.flags |= PROTO_FLAG_TEARDOWN_ON_L3_LINK_DOWN;
 
+	tmp = json_get_field(obj, "persistent-worker", json_type_boolean);
+	if (tmp && json_object_get_boolean(tmp))
+		handler->persistent_worker = true;
+
 	config = json_get_field(obj, "config", json_type_array);
 	if (config)
 		handler->config_buf = netifd_handler_parse_config(&handler->config, config);
@@ -940,6 +1422,16 @@ proto_shell_add_handler(const char *script, const char *name, json_object *obj)
 	add_proto_handler(proto);
 }
 
+/* the scripts and the libraries they source are read again on the next request */
+void proto_shell_reload(void)
+{
+	struct proto_shell_worker *worker;
+
+	list_for_each_entry(worker, &workers, list)
+		if (!worker->retired)
+			proto_shell_worker_retire(worker);
+}
+
 void proto_shell_init(void)
 {
 	proto_fd = netifd_open_subdir("proto");
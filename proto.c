@@ -25,6 +25,7 @@
 #include "interface.h"
 #include "interface-ip.h"
 #include "proto.h"
+#include "stats.h"
 
 static struct avl_tree handlers;
 
@@ -664,6 +665,7 @@ interface_proto_event(struct interface_proto_state *proto,
 		      enum interface_proto_cmd cmd, bool force)
 {
 	enum interface_proto_event ev;
+	uint64_t start = netifd_stat_start();
 	int ret;
 
 	ret = proto->cb(proto, cmd, force);
@@ -681,10 +683,12 @@ interface_proto_event(struct interface_proto_state *proto,
 		ev = IFPEV_RENEW;
 		break;
 	default:
-		return -EINVAL;
+		ret = -EINVAL;
+		goto out;
 	}
 	proto->proto_event(proto, ev);
 
 out:
+	netifd_stat_stop(NETIFD_STAT_PROTO_EVENT, start);
 	return ret;
 }
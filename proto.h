@@ -81,5 +81,6 @@ int proto_apply_static_ip_settings(struct interface *iface, struct blob_attr *at
 int proto_apply_ip_settings(struct interface *iface, struct blob_attr *attr, bool ext);
 void proto_dump_handlers(struct blob_buf *b);
 void proto_shell_init(void);
+void proto_shell_reload(void);
 
 #endif
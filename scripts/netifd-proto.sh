@@ -429,6 +429,49 @@ proto_setup_failed() {
 	_proto_notify "$interface"
 }
 
+_proto_worker_run() {
+	local id="$1"
+	local marker="$(printf '\001')done "
+
+	# the output is tagged with the request id, "done" is passed through
+	# the same pipe so that it is reported after the last line
+	{
+		(
+			unset ERROR
+			[ "$error" = "-" ] || export ERROR="$error"
+			[ "$ifname" = "-" ] && ifname=
+
+			case "$cmd" in
+				setup) _proto_do_setup "$proto";;
+				teardown) _proto_do_teardown "$proto" ;;
+				renew) _proto_do_renew "$proto" ;;
+				*) exit 1 ;;
+			esac
+		) </dev/null 3>&- &
+		echo "$id start $!" >&3
+		wait $!
+		echo "$marker$?"
+	} 2>&1 | while IFS= read -r line || [ -n "$line" ]; do
+		case "$line" in
+			*"$marker"*)
+				# output without a final newline ends up in front of it
+				[ -n "${line%%"$marker"*}" ] && echo "$id ${line%%"$marker"*}"
+				echo "$id done ${line##*"$marker"}" >&3
+			;;
+			*) echo "$id $line" ;;
+		esac
+	done
+}
+
+_proto_worker_loop() {
+	local id
+
+	while IFS="	" read -r id proto cmd interface ifname error data; do
+		# detach, so that a slow action does not hold up the next request
+		( _proto_worker_run "$id" </dev/null & )
+	done
+}
+
 init_proto() {
 	proto="$1"; shift
 	cmd="$1"; shift
@@ -441,6 +484,7 @@ init_proto() {
 				available=0
 				renew_handler=0
 				teardown_on_l3_link_down=0
+				persistent_worker=0
 
 				add_default_handler "proto_$1_init_config"
 
@@ -455,6 +499,7 @@ init_proto() {
 				json_add_boolean renew-handler "$renew_handler"
 				json_add_boolean lasterror "$lasterror"
 				json_add_boolean teardown-on-l3-link-down "$teardown_on_l3_link_down"
+				json_add_boolean persistent-worker "$persistent_worker"
 				json_dump
 			}
 		;;
@@ -474,5 +519,10 @@ init_proto() {
 				esac
 			}
 		;;
+		worker)
+			add_protocol() {
+				return 0
+			}
+		;;
 	esac
 }
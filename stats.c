@@ -0,0 +1,132 @@
+/*
+ * netifd - network interface daemon
+ *
+ * This program is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License version 2
+ * as published by the Free Software Foundation
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ */
+#include <limits.h>
+#include <string.h>
+#include <time.h>
+
+#include "netifd.h"
+#include "stats.h"
+
+struct netifd_stat_entry {
+	uint64_t count;
+	uint64_t total_us;
+	uint64_t max_us;
+	uint32_t hist[NETIFD_STAT_HIST_SIZE];
+};
+
+static const char * const stat_names[__NETIFD_STAT_MAX] = {
+	[NETIFD_STAT_CONFIG_INIT] = "config_init",
+	[NETIFD_STAT_INTERFACE_UPDATE] = "interface_update",
+	[NETIFD_STAT_RTNL_CALL] = "rtnl_call",
+	[NETIFD_STAT_DUMP_STATUS] = "dump_status",
+	[NETIFD_STAT_PROTO_EVENT] = "proto_event",
+};
+
+static struct netifd_stat_entry stats[__NETIFD_STAT_MAX];
+static uint64_t stats_since;
+
+static uint64_t
+netifd_stat_now(void)
+{
+	struct timespec ts;
+
+	if (clock_gettime(CLOCK_MONOTONIC, &ts) < 0)
+		return 0;
+
+	return (uint64_t)ts.tv_sec * 1000000 + ts.tv_nsec / 1000;
+}
+
+uint64_t
+netifd_stat_start(void)
+{
+	return netifd_stat_now();
+}
+
+void
+netifd_stat_stop(enum netifd_stat stat, uint64_t start)
+{
+	struct netifd_stat_entry *e = &stats[stat];
+	uint64_t duration = netifd_stat_now() - start;
+	int bucket = 0;
+
+	while (bucket < NETIFD_STAT_HIST_SIZE - 1 && (duration >> bucket))
+		bucket++;
+
+	e->count++;
+	e->total_us += duration;
+	if (duration > e->max_us)
+		e->max_us = duration;
+	e->hist[bucket]++;
+}
+
+/*
+ * libubox keeps pending timeouts in a private list sorted by expiry.
+ * A probe armed furthest in the future is queued last, so its next
+ * pointer is the list head and everything before it is an active timer.
+ */
+static unsigned int
+netifd_timer_count(void)
+{
+	struct uloop_timeout probe = {};
+	struct list_head *l;
+	unsigned int count = 0;
+
+	uloop_timeout_set(&probe, INT_MAX);
+	for (l = probe.list.prev; l != probe.list.next; l = l->prev)
+		count++;
+	uloop_timeout_cancel(&probe);
+
+	return count;
+}
+
+void
+netifd_stat_dump(struct blob_buf *b)
+{
+	void *c, *t, *a;
+	int i, j;
+
+	blobmsg_add_u64(b, "interval_us", netifd_stat_now() - stats_since);
+	blobmsg_add_u32(b, "processes", netifd_process_count());
+	blobmsg_add_u32(b, "timers", netifd_timer_count());
+
+	c = blobmsg_open_table(b, "stats");
+	for (i = 0; i < __NETIFD_STAT_MAX; i++) {
+		struct netifd_stat_entry *e = &stats[i];
+
+		t = blobmsg_open_table(b, stat_names[i]);
+		blobmsg_add_u64(b, "count", e->count);
+		blobmsg_add_u64(b, "total_us", e->total_us);
+		blobmsg_add_u64(b, "max_us", e->max_us);
+
+		a = blobmsg_open_array(b, "histogram");
+		for (j = 0; j < NETIFD_STAT_HIST_SIZE; j++)
+			blobmsg_add_u32(b, NULL, e->hist[j]);
+		blobmsg_close_array(b, a);
+
+		blobmsg_close_table(b, t);
+	}
+	blobmsg_close_table(b, c);
+}
+
+void
+netifd_stat_reset(void)
+{
+	memset(stats, 0, sizeof(stats));
+	stats_since = netifd_stat_now();
+}
+
+static void __init
+netifd_stat_init(void)
+{
+	stats_since = netifd_stat_now();
+}
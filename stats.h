@@ -0,0 +1,41 @@
+/*
+ * netifd - network interface daemon
+ *
+ * This program is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License version 2
+ * as published by the Free Software Foundation
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ */
+#ifndef __NETIFD_STATS_H
+#define __NETIFD_STATS_H
+
+#include <stdint.h>
+#include <libubox/blobmsg.h>
+
+enum netifd_stat {
+	NETIFD_STAT_CONFIG_INIT,
+	NETIFD_STAT_INTERFACE_UPDATE,
+	NETIFD_STAT_RTNL_CALL,
+	NETIFD_STAT_DUMP_STATUS,
+	NETIFD_STAT_PROTO_EVENT,
+	__NETIFD_STAT_MAX
+};
+
+/*
+ * Durations are kept in log2 buckets of microseconds:
+ * bucket 0 holds calls below 1us, bucket n holds calls in [2^(n-1), 2^n) us,
+ * the last bucket also collects everything above.
+ */
+#define NETIFD_STAT_HIST_SIZE	24
+
+uint64_t netifd_stat_start(void);
+void netifd_stat_stop(enum netifd_stat stat, uint64_t start);
+
+void netifd_stat_dump(struct blob_buf *b);
+void netifd_stat_reset(void);
+
+#endif
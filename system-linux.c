@@ -75,6 +75,7 @@
 #include "device.h"
 #include "system.h"
 #include "utils.h"
+#include "stats.h"
 
 struct event_socket {
 	struct uloop_fd uloop;
@@ -797,15 +798,18 @@ abort:
 
 static int system_rtnl_call(struct nl_msg *msg)
 {
+	uint64_t start = netifd_stat_start();
 	int ret;
 
 	ret = nl_send_auto_complete(sock_rtnl, msg);
 	nlmsg_free(msg);
 
-	if (ret < 0)
-		return ret;
+	if (ret >= 0)
+		ret = nl_wait_for_ack(sock_rtnl);
 
-	return nl_wait_for_ack(sock_rtnl);
+	netifd_stat_stop(NETIFD_STAT_RTNL_CALL, start);
+
+	return ret;
 }
 
 static struct nl_msg *__system_ifinfo_msg(int af, int index, const char *ifname, uint16_t type, uint16_t flags)
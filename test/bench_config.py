@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import logging
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+
+from test_runner.loader import TestSuite
+from test_runner.runner import TestSuiteRun
+from test_runner.writer import ResultWriter
+from test_runner.cli import setup_logger, write_results, run_main
+
+logger = setup_logger("bench_config.py")
+
+NETWORK_HEAD = """config interface loopback
+	option device  lo
+	option proto   static
+	option ipaddr  127.0.0.1
+	option netmask 255.0.0.0
+"""
+
+
+def write_suite(path: str, count: int) -> None:
+    """
+    Create <count> static interfaces, each on its own VLAN device of eth0
+    with a route, so every section type the snapshot replays grows
+    """
+    with open(os.path.join(path, "network"), "w") as f:
+        f.write(NETWORK_HEAD)
+        for i in range(count):
+            f.write("\nconfig device\n")
+            f.write("\toption type   8021q\n")
+            f.write("\toption ifname eth0\n")
+            f.write(f"\toption vid    {i + 1}\n")
+            f.write(f"\toption name   eth0.{i + 1}\n")
+            f.write(f"\nconfig interface lan{i}\n")
+            f.write(f"\toption device  eth0.{i + 1}\n")
+            f.write("\toption proto   static\n")
+            f.write(f"\toption ipaddr  10.{i >> 8}.{i & 255}.1\n")
+            f.write("\toption netmask 255.255.255.0\n")
+            f.write(f"\nconfig route r{i}\n")
+            f.write(f"\toption interface lan{i}\n")
+            f.write(f"\toption target    172.{16 + (i >> 8)}.{i & 255}.0/24\n")
+            f.write(f"\toption gateway   10.{i >> 8}.{i & 255}.254\n")
+
+    with open(os.path.join(path, "waitfor"), "w") as f:
+        f.write("lan0\n")
+        if count > 1:
+            f.write(f"lan{count - 1}\n")
+
+
+class ConfigBenchRun(TestSuiteRun):
+    def config_init_us(self) -> int:
+        return self.get_stats()["stats"]["config_init"]["total_us"]
+
+
+def run_benchmark(rw: ResultWriter, count: int) -> None:
+    with TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, f"test_config_{count}")
+        os.mkdir(path)
+        write_suite(path, count)
+        suite = TestSuite(path)
+
+        with rw.start_suite(suite.name):
+            with ConfigBenchRun(logger, rw, suite) as run:
+                with rw.start_test("Cold"):
+                    try:
+                        start = time.monotonic()
+                        run.start()
+                        cold_time = time.monotonic() - start
+                        cold_us = run.config_init_us()
+                    except (RuntimeError, TimeoutError) as e:
+                        rw.fatal(str(e))
+                        return
+                    rw.add_property("start_s", "%0.3f" % cold_time)
+                    rw.add_property("config_init_us", str(cold_us))
+
+                with rw.start_test("Warm"):
+                    try:
+                        start = time.monotonic()
+                        run.restart_netifd("netifd.warm.log")
+                        warm_time = time.monotonic() - start
+                        warm_us = run.config_init_us()
+                    except (RuntimeError, TimeoutError) as e:
+                        rw.fatal(str(e))
+                        return
+                    rw.add_property("start_s", "%0.3f" % warm_time)
+                    rw.add_property("config_init_us", str(warm_us))
+                    if not run.used_config_snapshot("netifd.warm.log"):
+                        rw.fail("The warm start did not use the network config snapshot")
+
+                logger.info("%5d interfaces: config_init cold %8dus, warm %8dus (%.1fx), start cold %.3fs, warm %.3fs",
+                            count, cold_us, warm_us, cold_us / max(warm_us, 1), cold_time, warm_time)
+
+def main() -> int:
+    parser = ArgumentParser()
+    parser.add_argument("-o", "--output", default="bench_config.xml", help="xunit xml output")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
+    parser.add_argument("interfaces", metavar="N", type=int, nargs="*", default=[10, 100, 1000],
+                        help="Numbers of interfaces to sweep")
+    args = parser.parse_args()
+    if any(n < 1 or n > 4094 for n in args.interfaces):
+        parser.error("interface counts must be between 1 and 4094 (one VLAN per interface)")
+    logger.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
+    def run(rw: ResultWriter) -> None:
+        for count in args.interfaces:
+            run_benchmark(rw, count)
+
+    return write_results(args.output, logger, run)
+
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import logging
+import ipaddress
+import subprocess
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from typing import Dict, Set, Tuple
+
+from test_runner.loader import TestSuite
+from test_runner.runner import TestSuiteRun, Timer
+from test_runner.writer import ResultWriter
+from test_runner.process import run_process
+from test_runner.cli import setup_logger, write_results, run_main
+
+ROUTE_BASE = ipaddress.IPv4Address("100.64.0.0")
+GATEWAYS = ["10.0.0.1", "10.0.0.254"]
+
+logger = setup_logger("bench_routes.py")
+
+NETWORK_HEAD = """config interface loopback
+	option device  lo
+	option proto   static
+	option ipaddr  127.0.0.1
+	option netmask 255.0.0.0
+
+config interface lan
+	option device  eth0
+	option proto   static
+	option ipaddr  10.0.0.2
+	option netmask 255.255.255.0
+"""
+
+# maps the uci section name to (target, gateway)
+RouteTable = Dict[str, Tuple[str, str]]
+
+
+def generate_routes(first: int, count: int, gateway: str = GATEWAYS[0]) -> RouteTable:
+    return {
+        f"r{i}": (str(ROUTE_BASE + i), gateway)
+            for i in range(first, first + count)
+    }
+
+def churn_routes(routes: RouteTable, churn: float) -> RouteTable:
+    """
+    Derive a reload table from <routes>:
+    the first <churn> share gets a new gateway (replaced in place),
+    the next share is dropped and the same amount of new routes is added.
+    """
+    count = len(routes)
+    changed = int(count * churn)
+    names = list(routes.keys())
+
+    result = dict(routes)
+    for name in names[:changed]:
+        result[name] = (routes[name][0], GATEWAYS[1])
+    for name in names[changed:2 * changed]:
+        del result[name]
+    result.update(generate_routes(count, changed))
+    return result
+
+def write_network_config(path: str, routes: RouteTable) -> None:
+    with open(os.path.join(path, "network"), "w") as f:
+        f.write(NETWORK_HEAD)
+        for name, (target, gateway) in routes.items():
+            f.write(f"\nconfig route {name}\n")
+            f.write("\toption interface lan\n")
+            f.write(f"\toption target    {target}/32\n")
+            f.write(f"\toption gateway   {gateway}\n")
+
+
+class RouteBenchRun(TestSuiteRun):
+    netifd_started: float = 0
+
+    def _start_netifd(self, logname: str = "netifd.log") -> None:
+        self.netifd_started = time.monotonic()
+        super()._start_netifd(logname)
+
+    def _kernel_routes(self) -> Set[Tuple[str, str]]:
+        res = run_process(
+            ["ip", "-4", "-j", "route", "show", "dev", "eth0", "protocol", "static"],
+            self._netns_test,
+            stdout = subprocess.PIPE,
+            stderr = subprocess.DEVNULL
+        )
+        if res["rc"] != 0 or not res["stdout"]:
+            return set()
+        return set([
+            (r["dst"], r.get("gateway"))
+                for r in json.loads(res["stdout"])
+        ])
+
+    def wait_for_routes(self, routes: RouteTable, timeout: float) -> bool:
+        expected = set(routes.values())
+        timer = Timer(timeout)
+        while self._kernel_routes() != expected:
+            if timer.expired:
+                return False
+            time.sleep(0.1)
+        return True
+
+
+def run_benchmark(rw: ResultWriter, count: int, churn: float, timeout: float) -> None:
+    with TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, f"test_routes_{count}")
+        os.mkdir(path)
+        with open(os.path.join(path, "waitfor"), "w") as f:
+            f.write("lan\n")
+        routes = generate_routes(0, count)
+        write_network_config(path, routes)
+        suite = TestSuite(path)
+
+        with rw.start_suite(suite.name):
+            with RouteBenchRun(logger, rw, suite) as run:
+                with rw.start_test("Setup"):
+                    try:
+                        run.start()
+                    except TimeoutError as e:
+                        rw.fatal("Timeout: " + e.args[0])
+                        return
+
+                with rw.start_test("Apply"):
+                    if not run.wait_for_routes(routes, timeout):
+                        rw.fatal(f"Routes not applied within {timeout}s")
+                        return
+                    apply_time = time.monotonic() - run.netifd_started
+                    rw.add_property("apply_time", "%0.3f" % apply_time)
+
+                routes = churn_routes(routes, churn)
+                write_network_config(path, routes)
+                with rw.start_test("Reload"):
+                    start = time.monotonic()
+                    try:
+                        run.reload_network()
+                    except RuntimeError as e:
+                        rw.fatal(str(e))
+                        return
+                    if not run.wait_for_routes(routes, timeout):
+                        rw.fatal(f"Routes not converged within {timeout}s after reload")
+                        return
+                    reload_time = time.monotonic() - start
+                    rw.add_property("reload_time", "%0.3f" % reload_time)
+
+                logger.info("%d routes: apply %.3fs, reload (%d%% churn) %.3fs",
+                            count, apply_time, int(churn * 100), reload_time)
+
+def main() -> int:
+    parser = ArgumentParser()
+    parser.add_argument("-o", "--output", default="bench_routes.xml", help="xunit xml output")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
+    parser.add_argument("-c", "--churn", type=float, default=0.1,
+                        help="Share of routes to replace, remove and add on reload")
+    parser.add_argument("-t", "--timeout", type=float, default=120, help="Convergence timeout in seconds")
+    parser.add_argument("routes", metavar="N", type=int, nargs="*", default=[1000, 10000],
+                        help="Route table sizes to benchmark")
+    args = parser.parse_args()
+    logger.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
+    def run(rw: ResultWriter) -> None:
+        for count in args.routes:
+            run_benchmark(rw, count, args.churn, args.timeout)
+
+    return write_results(args.output, logger, run)
+
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import logging
+import subprocess
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from typing import List
+
+from test_runner.loader import TestSuite
+from test_runner.runner import TestSuiteRun
+from test_runner.writer import ResultWriter
+from test_runner.process import run_process
+from test_runner.cli import setup_logger, write_results, run_main
+
+UBUS_BENCH_PATH = "/opt/netifd/bin/ubus-bench"
+
+logger = setup_logger("bench_ubus.py")
+
+# name, object, method, message
+ENDPOINTS = [
+    ("interface_status", "network.interface.lan0", "status", None),
+    ("device_status", "network.device", "status", None),
+    ("interface_dump", "network.interface", "dump", None),
+    ("wireless_status", "network.wireless", "status", None),
+]
+
+NETWORK_HEAD = """config interface loopback
+	option device  lo
+	option proto   static
+	option ipaddr  127.0.0.1
+	option netmask 255.0.0.0
+"""
+
+
+def write_suite(path: str, count: int) -> None:
+    """
+    Create <count> static interfaces, each on its own VLAN device of eth0,
+    so both the interface and the device tree grow with the sweep
+    """
+    with open(os.path.join(path, "network"), "w") as f:
+        f.write(NETWORK_HEAD)
+        for i in range(count):
+            f.write(f"\nconfig interface lan{i}\n")
+            f.write(f"\toption device  eth0.{i + 1}\n")
+            f.write("\toption proto   static\n")
+            f.write(f"\toption ipaddr  10.{i >> 8}.{i & 255}.1\n")
+            f.write("\toption netmask 255.255.255.0\n")
+
+    with open(os.path.join(path, "waitfor"), "w") as f:
+        f.write("lan0\n")
+        if count > 1:
+            f.write(f"lan{count - 1}\n")
+
+
+class UbusBenchRun(TestSuiteRun):
+    def bench(self, obj: str, method: str, message: str, clients: int, duration: int) -> dict:
+        cmd = [
+            UBUS_BENCH_PATH,
+            "-c", str(clients),
+            "-d", str(duration),
+            obj, method
+        ]
+        if message:
+            cmd.append(message)
+        res = run_process(cmd, self._netns_test, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if res["rc"] != 0:
+            raise RuntimeError(res["stderr"] or f"ubus-bench failed with exit code {res['rc']}")
+        return json.loads(res["stdout"])
+
+
+def run_benchmark(rw: ResultWriter, count: int, clients: List[int], duration: int) -> List[dict]:
+    results = []
+    with TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, f"test_ubus_{count}")
+        os.mkdir(path)
+        write_suite(path, count)
+        suite = TestSuite(path)
+
+        with rw.start_suite(suite.name):
+            with UbusBenchRun(logger, rw, suite) as run:
+                with rw.start_test("Setup"):
+                    try:
+                        run.start()
+                    except TimeoutError as e:
+                        rw.fatal("Timeout: " + e.args[0])
+                        return results
+
+                for name, obj, method, message in ENDPOINTS:
+                    for c in clients:
+                        with rw.start_test(f"{name}.c{c}"):
+                            try:
+                                res = run.bench(obj, method, message, c, duration)
+                            except (RuntimeError, ValueError) as e:
+                                rw.fatal(str(e))
+                                continue
+                            res.update(interfaces=count, endpoint=name)
+                            results.append(res)
+                            rw.add_property(f"{name}.c{c}.rps", str(res["rps"]))
+                            rw.add_property(f"{name}.c{c}.p50_us", str(res["latency_us"]["p50"]))
+                            rw.add_property(f"{name}.c{c}.p99_us", str(res["latency_us"]["p99"]))
+                            if res["errors"]:
+                                rw.fail(f"{res['errors']} of {res['requests']} calls failed")
+                            logger.info("%5d interfaces %-16s %3d clients: %9.1f req/s, p50 %6dus, p90 %6dus, p99 %6dus",
+                                        count, name, c, res["rps"], res["latency_us"]["p50"],
+                                        res["latency_us"]["p90"], res["latency_us"]["p99"])
+    return results
+
+def main() -> int:
+    parser = ArgumentParser()
+    parser.add_argument("-o", "--output", default="bench_ubus.xml", help="xunit xml output")
+    parser.add_argument("-j", "--json", help="Write all measurements to this JSON file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
+    parser.add_argument("-c", "--clients", type=int, nargs="+", default=[1, 4, 16],
+                        help="Numbers of concurrent clients to sweep")
+    parser.add_argument("-d", "--duration", type=int, default=5, help="Seconds per measurement")
+    parser.add_argument("interfaces", metavar="N", type=int, nargs="*", default=[1, 10, 100, 1000],
+                        help="Numbers of interfaces to sweep")
+    args = parser.parse_args()
+    if any(n < 1 or n > 4094 for n in args.interfaces):
+        parser.error("interface counts must be between 1 and 4094 (one VLAN per interface)")
+    logger.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
+    results = []
+
+    def run(rw: ResultWriter) -> None:
+        for count in args.interfaces:
+            results.extend(run_benchmark(rw, count, args.clients, args.duration))
+
+    ret = write_results(args.output, logger, run)
+    if ret >= 0 and args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return ret
+
+
+if __name__ == "__main__":
+    run_main(main)
@@ -1,58 +1,85 @@
 #!/usr/bin/env python3
 
 import os
-import sys
 import logging
 from argparse import ArgumentParser
 
-from test_runner.loader import TestException
-from test_runner.runner import TestRunner
+from test_runner.cli import setup_logger, write_results, run_main
+from test_runner.runner import TestRunner, NETIFD_PATH, NETIFD_SHELL_PATH
+from test_runner.fixture import UBUSD_PATH
+from test_runner.cache import ResultCache, shared_objects
 from test_runner.writer import ResultWriter
+from test_runner.profile import PROFILERS
+from test_runner.soak import SoakOptions
 
-def setup_logger():
-    global logger
-    logger = logging.Logger("run_tests.py")
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.DEBUG)
-    formatter = logging.Formatter('%(asctime)s %(levelname)7s %(message)s')
-    ch.setFormatter(formatter)
-    logger.addHandler(ch)
+# udhcp-script, isc-dhcp-script and zcip-script, run by netifd
+NETIFD_LIBEXEC_DIR = "/opt/netifd/libexec/netifd"
+# jshn.sh and the other shell libraries the helpers source
+NETIFD_SHARE_DIR = "/opt/netifd/share"
+# netifd-proto.sh and friends, sourced by the proto handlers of the suites
+SCRIPTS_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+NETIFD_LIB_DIR = "/opt/netifd/lib"
+# libraries netifd, ubusd and the scripts are linked against
+LINKED_LIBS = ["libubox", "libblobmsg_json", "libubus", "libuci"]
+
+logger = setup_logger("run_tests.py")
 
 def main() -> int:
     parser = ArgumentParser()
     parser.add_argument("-o", "--output", default="results.xml", help="xunit xml output")
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
     parser.add_argument("-s", "--shell", action="store_true", help="Create shell after setup")
+    parser.add_argument("-p", "--profile", choices=sorted(PROFILERS.keys()), help="Run netifd under a profiler")
+    parser.add_argument("--results-dir", default="results", help="Directory to store per-suite profiles and samples in")
+    parser.add_argument("--soak", type=float, metavar="SECONDS", help="Loop reload, ifdown/ifup and hotplug on one suite and check for leaks")
+    parser.add_argument("--soak-interval", type=float, default=5, help="Seconds between soak samples")
+    parser.add_argument("--soak-rss-slope", type=float, default=64, help="Maximum RSS growth in KiB/min")
+    parser.add_argument("--soak-fd-slope", type=float, default=0.5, help="Maximum open fd growth per minute")
+    parser.add_argument("--soak-process-slope", type=float, default=0.5, help="Maximum child process growth per minute")
+    parser.add_argument("--soak-timer-slope", type=float, default=0.5, help="Maximum pending timer growth per minute")
+    parser.add_argument("--cache-dir", default=".results_cache", help="Directory to cache results of passing suites in")
+    parser.add_argument("--no-cache", action="store_true", help="Run all suites even if a cached result is available")
     parser.add_argument("tests", metavar="T", type=str, nargs="*", help="Tests to execute")
     args = parser.parse_args()
-    setup_logger()
     logger.setLevel(logging.DEBUG if args.verbose else logging.INFO)
 
-    tests = args.tests
-    with ResultWriter(args.output, logger) as rw:
-        try:
-            runner = TestRunner(logger, os.path.join(os.path.dirname(os.path.realpath(__file__)), "testcases"))
-            tests = list(map(
-                lambda t: runner.get_suite(t) or t,
-                tests
-            ))
-            unknown = list(filter(lambda x: isinstance(x, str), tests))
-            if unknown:
-                logger.error("Unknown tests: %s", ", ".join(unknown))
-                rw.set_path(None)
-                return -1
-            runner.run(rw, tests, args.shell)
-        except KeyboardInterrupt:
-            rw.set_path(None)
-            logger.error("Aborted by keyboard interrupt")
+    def run(rw: ResultWriter):
+        runner = TestRunner(logger, os.path.join(os.path.dirname(os.path.realpath(__file__)), "testcases"))
+        tests = list(map(
+            lambda t: runner.get_suite(t) or t,
+            args.tests
+        ))
+        unknown = list(filter(lambda x: isinstance(x, str), tests))
+        if unknown:
+            logger.error("Unknown tests: %s", ", ".join(unknown))
             return -1
+        soak = None
+        if args.soak:
+            if len(tests) != 1:
+                logger.error("Soak mode needs exactly one test")
+                return -1
+            if args.profile:
+                logger.error("Soak mode cannot be combined with --profile")
+                return -1
+            soak = SoakOptions(
+                args.soak,
+                interval = args.soak_interval,
+                rss_slope = args.soak_rss_slope,
+                fd_slope = args.soak_fd_slope,
+                process_slope = args.soak_process_slope,
+                timer_slope = args.soak_timer_slope
+            )
+        profiler = PROFILERS[args.profile]() if args.profile else None
+        cache = None
+        if not args.no_cache:
+            files = [NETIFD_PATH, NETIFD_SHELL_PATH, UBUSD_PATH, os.path.abspath(__file__)]
+            files += shared_objects(NETIFD_LIB_DIR, LINKED_LIBS)
+            cache = ResultCache(logger, args.cache_dir, files,
+                                [NETIFD_LIBEXEC_DIR, NETIFD_SHARE_DIR, SCRIPTS_DIR])
+        runner.run(rw, tests, args.shell, profiler, args.results_dir, soak, cache)
 
-    return min(rw.failed_test_count, 255)
+    return write_results(args.output, logger, run)
 
 
 if __name__ == "__main__":
-    try:
-        sys.exit(main())
-    except TestException as e:
-        print(e)
-        sys.exit(1)
+    run_main(main)
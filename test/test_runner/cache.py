@@ -0,0 +1,120 @@
+import os
+import glob
+import json
+import hashlib
+from logging import Logger
+from typing import List, Optional
+
+from .loader import TestSuite
+
+RUNNER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def shared_objects(libdir: str, names: List[str]) -> List[str]:
+    """
+    Files of the libraries <names> in <libdir>. The versioned names are
+    symlinks to one file, every file is listed once.
+    """
+    files = set()
+    for name in names:
+        for path in glob.glob(os.path.join(libdir, name + ".so*")):
+            files.add(os.path.realpath(path))
+    return sorted(files)
+
+
+class CachedResult():
+    tests: List[str]
+    properties: dict
+
+    def __init__(self, tests: List[str], properties: dict) -> None:
+        self.tests = tests
+        self.properties = properties
+
+
+class ResultCache():
+    """
+    Results of passing suites, keyed by a hash of the suite directory,
+    the files under test, the directories of helpers and scripts they run
+    and the runner itself. Any change to one of them gives a new key, so
+    stale entries are never replayed.
+    """
+    _logger: Logger
+    _path: str
+    _files: List[str]
+    _trees: List[str]
+    _base: Optional[bytes] = None
+
+    def __init__(self, logger: Logger, path: str, files: List[str], trees: List[str] = None) -> None:
+        self._logger = logger
+        self._path = path
+        self._files = files
+        self._trees = trees or []
+
+    @staticmethod
+    def _hash_file(h, path: str) -> None:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+
+    def _hash_tree(self, h, root: str, suffix: str = "") -> None:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            for name in sorted(filenames):
+                if not name.endswith(suffix):
+                    continue
+                path = os.path.join(dirpath, name)
+                h.update(os.path.relpath(path, root).encode() + b"\0")
+                self._hash_file(h, path)
+
+    def _base_digest(self) -> bytes:
+        # files, trees and runner sources are the same for every suite of a run
+        if self._base is None:
+            h = hashlib.sha256()
+            for path in self._files:
+                h.update(path.encode() + b"\0")
+                self._hash_file(h, path)
+            for root in self._trees:
+                h.update(root.encode() + b"\0")
+                self._hash_tree(h, root)
+            self._hash_tree(h, RUNNER_DIR, ".py")
+            self._base = h.digest()
+        return self._base
+
+    def key(self, suite: TestSuite) -> Optional[str]:
+        try:
+            h = hashlib.sha256(self._base_digest())
+            self._hash_tree(h, suite.path)
+        except OSError as e:
+            self._logger.debug("Not caching %s: %s", suite.name, e)
+            return None
+        return h.hexdigest()
+
+    def _file(self, suite: TestSuite) -> str:
+        return os.path.join(self._path, suite.name + ".json")
+
+    def get(self, suite: TestSuite, key: str) -> Optional[CachedResult]:
+        try:
+            with open(self._file(suite)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("key") != key:
+            return None
+        return CachedResult(data["tests"], data["properties"])
+
+    def put(self, suite: TestSuite, key: str, result: CachedResult) -> None:
+        os.makedirs(self._path, exist_ok=True)
+        path = self._file(suite)
+        with open(path + ".tmp", "w") as f:
+            json.dump({
+                "key": key,
+                "tests": result.tests,
+                "properties": result.properties
+            }, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def invalidate(self, suite: TestSuite) -> None:
+        try:
+            os.remove(self._file(suite))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,42 @@
+import sys
+import logging
+from logging import Logger
+from typing import Callable, Optional
+
+from .loader import TestException
+from .writer import ResultWriter
+
+
+def setup_logger(name: str) -> Logger:
+    logger = logging.Logger(name)
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+    formatter = logging.Formatter('%(asctime)s %(levelname)7s %(message)s')
+    ch.setFormatter(formatter)
+    logger.addHandler(ch)
+    return logger
+
+def write_results(path: str, logger: Logger, run: Callable[[ResultWriter], Optional[int]]) -> int:
+    """
+    Call <run> with a ResultWriter for <path>. If it returns an exit code
+    or is interrupted, no results are written. Otherwise the exit code is
+    the number of failed tests.
+    """
+    with ResultWriter(path, logger) as rw:
+        try:
+            ret = run(rw)
+        except KeyboardInterrupt:
+            logger.error("Aborted by keyboard interrupt")
+            ret = -1
+        if ret is not None:
+            rw.set_path(None)
+            return ret
+
+    return min(rw.failed_test_count, 255)
+
+def run_main(main: Callable[[], int]) -> None:
+    try:
+        sys.exit(main())
+    except TestException as e:
+        print(e)
+        sys.exit(1)
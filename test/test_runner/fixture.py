@@ -0,0 +1,300 @@
+import os
+import time
+import ctypes
+import subprocess
+from logging import Logger
+from tempfile import TemporaryDirectory
+from pyroute2 import IPRoute, NetNS
+import pyroute2.netns
+from typing import Dict, List
+
+from .process import start_process, run_process, stop_processes
+
+UBUSD_PATH = "/opt/netifd/sbin/ubusd"
+UBUS_PATH = "/opt/netifd/bin/ubus"
+
+UBUS_START_TIMEOUT = 1
+UBUS_POLL_INTERVAL = 0.05
+UBUSD_STOP_TIMEOUT = 3
+
+MNT_DETACH = 2
+
+_libc = ctypes.CDLL(None, use_errno=True)
+
+# sysctls restored between suites, links created by netifd are deleted anyway
+SYSCTL_DIRS = [
+    "/proc/sys/net/ipv4",
+    "/proc/sys/net/ipv4/conf/all",
+    "/proc/sys/net/ipv4/conf/default",
+    "/proc/sys/net/ipv4/conf/lo",
+    "/proc/sys/net/ipv6",
+    "/proc/sys/net/ipv6/conf/all",
+    "/proc/sys/net/ipv6/conf/default",
+    "/proc/sys/net/ipv6/conf/lo",
+]
+
+RESET_IPV4 = [
+    "link set lo down",
+    "addr flush dev lo",
+    "route flush table all",
+    "rule flush",
+    "rule add pref 32766 table main",
+    "rule add pref 32767 table default",
+]
+
+RESET_IPV6 = [
+    "route flush table all",
+    "rule flush",
+    "rule add pref 32766 table main",
+]
+
+
+class Fixture():
+    """
+    Test namespace with the dummy eth0 and a running ubusd.
+    reset() brings it back to the state after setup(), so the
+    next suite only has to start netifd.
+    """
+    _logger: Logger
+    _ipr: IPRoute
+    _tempdir: TemporaryDirectory = None
+    _ubusd: subprocess.Popen = None
+    _sysctls: Dict[str, str] = None
+    name: str
+    netns: NetNS = None
+    veths: List[int] = None
+    # names of the veth peers inside of the namespace
+    peers: List[str] = None
+
+    def __init__(self, logger: Logger, ipr: IPRoute, name: str = "test") -> None:
+        self._logger = logger
+        self._ipr = ipr
+        self.name = name
+        self.veths = []
+        self.peers = []
+
+    def add_veth_pair(self, name: str, peername: str, peermac: str = None) -> int:
+        self._ipr.link('add',
+            ifname=name,
+            kind='veth',
+            peer={
+                "ifname": peername,
+                "net_ns_fd": self.netns.netns
+            }
+        )
+        idx = self._ipr.link_lookup(ifname=name)[0]
+        self._ipr.link('set', index=idx, state='up')
+        if peermac:
+            self.netns.link('set', ifname=peername, address=peermac)
+        self.veths.append(idx)
+        self.peers.append(peername)
+        return idx
+
+    def _setup_dummy_eth0(self) -> None:
+        self.add_veth_pair('netifd_eth0', 'eth0', '02:eb:eb:eb:eb:eb')
+
+    def _make_dummy_sysmount(self) -> None:
+        # ip netns exec tries to mount /sys in the namespace.
+        # In order to do that it lazy umounts /sys first.
+        # If this is the only mounted sysfs, further attempts to mount sys fail no with EPERM
+        # Just mounting another sysfs somewhere else resolves the problem
+        path = os.path.join(self._tempdir.name, "dummy_sys_mount")
+        os.mkdir(path)
+        if _libc.mount(b"none", path.encode(), b"sysfs", 0, None) != 0:
+            raise OSError(ctypes.get_errno(), f"Cannot mount sysfs on {path}")
+
+    def _umount_dummy_sys(self) -> None:
+        path = os.path.join(self._tempdir.name, "dummy_sys_mount")
+        if os.path.ismount(path) and _libc.umount2(path.encode(), MNT_DETACH) != 0:
+            self._logger.warning("Cannot umount %s: %s", path, os.strerror(ctypes.get_errno()))
+
+    def _wait_for_ubus(self) -> None:
+        deadline = time.monotonic() + UBUS_START_TIMEOUT
+        while True:
+            res = run_process(
+                [UBUS_PATH, "list"],
+                self.netns,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            if res['rc'] == 0:
+                break
+            if time.monotonic() >= deadline:
+                raise TimeoutError("Timeout waiting for ubus")
+            time.sleep(UBUS_POLL_INTERVAL)
+
+    def _read_sysctls(self) -> Dict[str, str]:
+        values = {}
+        pyroute2.netns.pushns(self.name)
+        try:
+            for d in SYSCTL_DIRS:
+                for entry in os.listdir(d):
+                    path = os.path.join(d, entry)
+                    if not os.path.isfile(path):
+                        continue
+                    try:
+                        with open(path) as f:
+                            values[path] = f.read()
+                    except OSError:
+                        pass
+        finally:
+            pyroute2.netns.popns()
+        return values
+
+    def _restore_sysctls(self) -> None:
+        current = self._read_sysctls()
+        pyroute2.netns.pushns(self.name)
+        try:
+            for path, value in self._sysctls.items():
+                if current.get(path, value) == value:
+                    continue
+                try:
+                    with open(path, "w") as f:
+                        f.write(value)
+                except OSError as e:
+                    self._logger.debug("Cannot restore %s: %s", path, e)
+        finally:
+            pyroute2.netns.popns()
+
+    def _netns_pids(self) -> List[int]:
+        """
+        Processes in the namespace that are not ubusd and not our own
+        children, the latter are NSPopen helpers reaped by their owners
+        """
+        ino = os.stat(f"/var/run/netns/{self.name}").st_ino
+        pids = []
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit() or (self._ubusd and int(entry) == self._ubusd.pid):
+                continue
+            try:
+                if os.stat(f"/proc/{entry}/ns/net").st_ino != ino:
+                    continue
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            if ppid != os.getpid():
+                pids.append(int(entry))
+        return pids
+
+    def _kill_leftovers(self) -> None:
+        for pid in self._netns_pids():
+            try:
+                os.kill(pid, 9)
+            except OSError:
+                pass
+
+    def _link_del_commands(self) -> List[str]:
+        return [
+            f"link del dev {link.get_attr('IFLA_IFNAME')}"
+                for link in self.netns.get_links()
+                if link.get_attr("IFLA_IFNAME") != "lo"
+        ]
+
+    def _ip_batch(self, family: str, commands: List[str]) -> None:
+        batch = os.path.join(self._tempdir.name, "reset.batch")
+        with open(batch, "w") as f:
+            f.writelines(c + "\n" for c in commands)
+        run_process(
+            ["ip", "-force", family, "-batch", batch],
+            self.netns,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def setup(self) -> None:
+        self._tempdir = TemporaryDirectory()
+        self._make_dummy_sysmount()
+        self.netns = NetNS(self.name)
+        self._sysctls = self._read_sysctls()
+        self._setup_dummy_eth0()
+        self._ubusd = start_process([UBUSD_PATH], self.netns)
+        self._logger.debug("Waiting for ubus to start")
+        self._wait_for_ubus()
+
+    def reset(self) -> None:
+        """
+        Kill what netifd left behind in the namespace, delete all links
+        except lo, flush addresses, routes and rules and restore sysctls
+        """
+        self._kill_leftovers()
+        self._ip_batch("-4", self._link_del_commands() + RESET_IPV4)
+        self._ip_batch("-6", RESET_IPV6)
+        self.veths = []
+        self.peers = []
+        self._restore_sysctls()
+        self._setup_dummy_eth0()
+
+    def destroy(self) -> None:
+        if self._ubusd:
+            stop_processes([self._ubusd], UBUSD_STOP_TIMEOUT)
+            self._ubusd = None
+        if self.netns:
+            # Deleting the peers inside the namespace in one batch takes the
+            # host side of every pair with them. The namespace itself goes
+            # away asynchronously, the links would linger until it does.
+            self._kill_leftovers()
+            try:
+                self._ip_batch("-4", self._link_del_commands())
+            except Exception as e:
+                self._logger.warning("Cannot delete links in %s: %s", self.name, e)
+            self.netns.remove()
+            self.netns.close()
+            self.netns = None
+        self.veths = []
+        self.peers = []
+        if self._tempdir:
+            self._umount_dummy_sys()
+            self._tempdir.cleanup()
+            self._tempdir = None
+
+
+class FixturePool():
+    """
+    Keeps fixtures warm across suites. A released fixture is reset
+    and handed out again, it is only rebuilt if the reset fails.
+    """
+    _logger: Logger
+    _ipr: IPRoute
+    _idle: List[Fixture]
+    _count: int = 0
+
+    def __init__(self, logger: Logger, ipr: IPRoute = None) -> None:
+        self._logger = logger
+        self._ipr = ipr or IPRoute()
+        self._idle = []
+
+    def _name(self) -> str:
+        name = "test" if self._count == 0 else f"test{self._count}"
+        self._count += 1
+        return name
+
+    def acquire(self) -> Fixture:
+        if self._idle:
+            return self._idle.pop()
+        fixture = Fixture(self._logger, self._ipr, self._name())
+        try:
+            fixture.setup()
+        except:
+            fixture.destroy()
+            raise
+        return fixture
+
+    def release(self, fixture: Fixture) -> None:
+        try:
+            fixture.reset()
+        except Exception as e:
+            self._logger.warning("Cannot reset namespace %s, recreating it: %s", fixture.name, e)
+            fixture.destroy()
+            return
+        self._idle.append(fixture)
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().destroy()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
@@ -1,5 +1,6 @@
 import os
-from typing import List
+import json
+from typing import Dict, List, Tuple
 
 SUPPORTED_JSON_RESULT_PREFIXES = [
     "ipaddr4",
@@ -11,6 +12,13 @@ SUPPORTED_JSON_RESULT_PREFIXES = [
     "sysctl6"
 ]
 NETWORK_CONFIG_NAME = "network"
+RELOAD_CONFIG_NAME = "network.reload"
+RELOAD_EVENTS_NAME = "reload.json"
+PROTO_DIR_NAME = "proto"
+GLOBAL_RESULT_FILES = [
+    "nameservers",
+    "stats.json"
+]
 
 class TestException(Exception):
     pass
@@ -46,8 +54,8 @@ class InterfaceFile():
         self.name = os.path.splitext(os.path.basename(path))[0]
         self.path = path
         base,_ = os.path.splitext(os.path.basename(path))
-        if base == "nameservers":
-            self.type = "nameservers"
+        if base in ("nameservers", "stats"):
+            self.type = base
             self.interface = None
             self.version = 0
         else:
@@ -72,6 +80,11 @@ class TestSuite():
     validation_files: List[InterfaceFile]
     waitfor_interfaces: List[str]
     dhcp_config: List[DHCPConfigFile]
+    reload_config: str
+    reload_events: Dict[str, dict]
+    proto_dir: str
+    ifdown_interfaces: List[Tuple[str, float]]
+    restart: bool
 
     def __init__(self, testdir: str) -> None:
         self._path = testdir
@@ -79,6 +92,11 @@ class TestSuite():
         self.validation_files = []
         self.waitfor_interfaces = []
         self.dhcp_config = []
+        self.reload_config = None
+        self.reload_events = {}
+        self.proto_dir = None
+        self.ifdown_interfaces = []
+        self.restart = False
         self._load()
 
     def _load(self):
@@ -92,10 +110,29 @@ class TestSuite():
             if (entry.startswith("dhcpd4_") or entry.startswith("dhcpd6_")) and entry.endswith(".conf"):
                 dhcp = DHCPConfigFile(fullpath)
                 self.dhcp_config.append(dhcp)
+            elif entry == RELOAD_CONFIG_NAME:
+                self.reload_config = fullpath
+            elif entry == RELOAD_EVENTS_NAME:
+                # {"routes": {<destination>: {"new": <count>, "deleted": <count>}},
+                #  "devices": {"removed": [<device>, ...], "kept": [<device>, ...]}}
+                with open(fullpath) as f:
+                    self.reload_events = json.load(f)
+            elif entry == PROTO_DIR_NAME and os.path.isdir(fullpath):
+                self.proto_dir = fullpath
+            elif entry == "restart":
+                self.restart = True
+            elif entry == "ifdown":
+                # <interface> [<minimum seconds until it is up again>]
+                with open(fullpath) as f:
+                    for line in f:
+                        fields = line.split()
+                        if not fields or fields[0].startswith('#'):
+                            continue
+                        self.ifdown_interfaces.append((fields[0], float(fields[1]) if len(fields) > 1 else 0))
             elif entry == "waitfor":
                 with open(fullpath) as f:
                     self.waitfor_interfaces = [e.strip() for e in f.readlines() if e.strip() and not e.strip().startswith('#')]
-            elif entry == "nameservers":
+            elif entry in GLOBAL_RESULT_FILES:
                 self.validation_files.append(InterfaceFile(fullpath))
             elif entry.endswith(".json") and entry.split("_")[0] in SUPPORTED_JSON_RESULT_PREFIXES:
                 self.validation_files.append(InterfaceFile(fullpath))
@@ -106,6 +143,10 @@ class TestSuite():
     def network_config(self) -> str:
         return os.path.join(self._path, NETWORK_CONFIG_NAME)
 
+    @property
+    def path(self) -> str:
+        return self._path
+
     @property
     def name(self) -> str:
         return self._name
@@ -1,16 +1,56 @@
 import os
+import time
+import threading
 import subprocess
 from pyroute2 import NetNS, NSPopen
-from typing import List
+from typing import List, Union
 
-def start_process(cmd: List[str], netns: NetNS = None, log: str = None) -> subprocess.Popen:
+
+class TimestampedLog():
+    """
+    Pipe to a log file, every line is prefixed with the monotonic time it
+    was read at. Captures of different processes share the clock and can
+    be merged into one timeline.
+    """
+    path: str
+    fd: int
+    _thread: threading.Thread
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        rfd, self.fd = os.pipe()
+        self._thread = threading.Thread(target=self._copy, args=(rfd,), daemon=True)
+        self._thread.start()
+
+    def _copy(self, rfd: int) -> None:
+        with os.fdopen(rfd, "rb") as src, open(self.path, "w") as dst:
+            for line in src:
+                dst.write("%.6f %s\n" % (time.monotonic(), line.decode(errors="replace").rstrip("\n")))
+
+    def close_writer(self) -> None:
+        """
+        Drop our copy of the write end once the process was started,
+        the log ends when the process closes its own
+        """
+        if self.fd != -1:
+            os.close(self.fd)
+            self.fd = -1
+
+    def join(self, timeout: float) -> None:
+        self._thread.join(timeout)
+
+
+def start_process(cmd: List[str], netns: NetNS = None, log: Union[str, TimestampedLog] = None) -> subprocess.Popen:
     args = dict(
         args = cmd,
         shell = False
     )
 
     fd = -1
-    if log:
+    if isinstance(log, TimestampedLog):
+        args["stderr"] = subprocess.STDOUT
+        args["stdout"] = log.fd
+    elif log:
         fd = os.open(log, os.O_RDWR | os.O_CREAT)
         args["stderr"] = subprocess.STDOUT
         args["stdout"] = fd
@@ -23,6 +63,8 @@ def start_process(cmd: List[str], netns: NetNS = None, log: str = None) -> subpr
         process = NSPopen(netns.netns, **args)
     if fd != -1:
         os.close(fd)
+    if isinstance(log, TimestampedLog):
+        log.close_writer()
     return process
 
 def run_process(cmd: List[str], netns: NetNS = None, stdout: str = None, stderr: str = None, shell = False) -> dict:
@@ -73,3 +115,39 @@ def run_process(cmd: List[str], netns: NetNS = None, stdout: str = None, stderr:
         res['stderr'] = out[1].decode(errors="replace").strip()
 
     return res
+
+
+def stop_processes(processes: List[subprocess.Popen], timeout: float) -> List[subprocess.Popen]:
+    """
+    Send SIGTERM to all processes at once and reap them against one shared
+    deadline. Processes still running at the deadline get SIGKILL.
+    Returns the processes that had to be killed.
+    """
+    for process in processes:
+        try:
+            process.terminate()
+        except (OSError, ProcessLookupError):
+            pass
+
+    deadline = time.monotonic() + timeout
+    running = list(processes)
+    while running and time.monotonic() < deadline:
+        running = [p for p in running if p.poll() is None]
+        if running:
+            time.sleep(0.02)
+
+    for process in running:
+        try:
+            process.kill()
+        except (OSError, ProcessLookupError):
+            pass
+
+    for process in processes:
+        try:
+            process.wait()
+            if hasattr(process, "release"):
+                process.release()
+        except OSError:
+            # NSPopen.release sometimes raises a EBADFD
+            pass
+    return running
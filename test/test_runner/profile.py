@@ -0,0 +1,164 @@
+import os
+import re
+import glob
+import subprocess
+from typing import List, Tuple
+
+PERF_PATH = "perf"
+VALGRIND_PATH = "valgrind"
+HEAPTRACK_PATH = "heaptrack"
+HEAPTRACK_PRINT_PATH = "heaptrack_print"
+
+TOP_SYMBOL_COUNT = 10
+
+
+class ProfileError(Exception):
+    pass
+
+class ProfileSummary():
+    peak_heap: int
+    cpu_samples: int
+    top_symbols: List[Tuple[str, str]]
+
+    def __init__(self) -> None:
+        self.peak_heap = None
+        self.cpu_samples = None
+        self.top_symbols = []
+
+    def properties(self) -> dict:
+        props = {}
+        if self.peak_heap is not None:
+            props["peak_heap_bytes"] = str(self.peak_heap)
+        if self.cpu_samples is not None:
+            props["cpu_samples"] = str(self.cpu_samples)
+        return props
+
+    def __str__(self) -> str:
+        lines = []
+        if self.peak_heap is not None:
+            lines.append(f"Peak heap: {self.peak_heap} bytes")
+        if self.cpu_samples is not None:
+            lines.append(f"CPU samples: {self.cpu_samples}")
+        if self.top_symbols:
+            lines.append("Top symbols:")
+            lines += [f"  {value:>12}  {symbol}" for symbol, value in self.top_symbols]
+        return "\n".join(lines)
+
+
+def _parse_size(value: str) -> int:
+    match = re.match(r"^([\d.]+)\s*([KMGT]?)(i?)B?$", value.strip())
+    if not match:
+        raise ProfileError(f"Cannot parse size '{value}'")
+    base = 1024 if match.group(3) else 1000
+    return int(float(match.group(1)) * base ** " KMGT".index(match.group(2) or " "))
+
+def _run_tool(cmd: List[str]) -> str:
+    try:
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        raise ProfileError(f"{cmd[0]} is not installed")
+    if res.returncode != 0:
+        raise ProfileError(f"{cmd[0]} failed with exit code {res.returncode}")
+    return res.stdout.decode(errors="replace")
+
+
+class Profiler():
+    """
+    Wraps the netifd command line and summarizes the recorded profile.
+    The profile is written to a directory, that outlives the suite run.
+    """
+    name: str = None
+
+    def command(self, outdir: str) -> List[str]:
+        raise NotImplementedError()
+
+    def summarize(self, outdir: str) -> ProfileSummary:
+        raise NotImplementedError()
+
+class PerfProfiler(Profiler):
+    name = "perf"
+
+    def command(self, outdir: str) -> List[str]:
+        return [PERF_PATH, "record", "-g", "-o", os.path.join(outdir, "perf.data"), "--"]
+
+    def summarize(self, outdir: str) -> ProfileSummary:
+        out = _run_tool([
+            PERF_PATH, "report",
+            "-i", os.path.join(outdir, "perf.data"),
+            "--stdio", "--quiet", "--no-children",
+            "-g", "none", "-n",
+            "--sort", "symbol"
+        ])
+        summary = ProfileSummary()
+        summary.cpu_samples = 0
+        for line in out.splitlines():
+            match = re.match(r"^\s*([\d.]+)%\s+(\d+)\s+\[.\]\s+(.+)$", line)
+            if not match:
+                continue
+            summary.cpu_samples += int(match.group(2))
+            if len(summary.top_symbols) < TOP_SYMBOL_COUNT:
+                summary.top_symbols.append((match.group(3).strip(), match.group(1) + "%"))
+        return summary
+
+class MassifProfiler(Profiler):
+    name = "massif"
+
+    def command(self, outdir: str) -> List[str]:
+        return [VALGRIND_PATH, "--tool=massif", "--massif-out-file=" + os.path.join(outdir, "massif.out")]
+
+    def summarize(self, outdir: str) -> ProfileSummary:
+        path = os.path.join(outdir, "massif.out")
+        if not os.path.isfile(path):
+            raise ProfileError("massif did not write a profile")
+
+        summary = ProfileSummary()
+        summary.peak_heap = 0
+        heap = 0
+        in_peak_tree = False
+        with open(path) as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.startswith("snapshot="):
+                    in_peak_tree = False
+                    heap = 0
+                elif line.startswith("mem_heap_B=") or line.startswith("mem_heap_extra_B="):
+                    heap += int(line.split("=", 1)[1])
+                    summary.peak_heap = max(summary.peak_heap, heap)
+                elif line == "heap_tree=peak":
+                    in_peak_tree = True
+                    summary.top_symbols = []
+                elif in_peak_tree:
+                    # direct children of the tree root carry a single space indent
+                    match = re.match(r"^ n\d+: (\d+) (?:0x[0-9A-Fa-f]+: )?(.+)$", line)
+                    if match and len(summary.top_symbols) < TOP_SYMBOL_COUNT:
+                        summary.top_symbols.append((match.group(2), match.group(1) + " B"))
+        return summary
+
+class HeaptrackProfiler(Profiler):
+    name = "heaptrack"
+
+    def command(self, outdir: str) -> List[str]:
+        return [HEAPTRACK_PATH, "-o", os.path.join(outdir, "heaptrack.netifd")]
+
+    def summarize(self, outdir: str) -> ProfileSummary:
+        files = sorted(glob.glob(os.path.join(outdir, "heaptrack.netifd*")))
+        if not files:
+            raise ProfileError("heaptrack did not write a profile")
+        out = _run_tool([HEAPTRACK_PRINT_PATH, "--print-peaks", "1", files[-1]])
+
+        summary = ProfileSummary()
+        lines = out.splitlines()
+        for i, line in enumerate(lines):
+            match = re.match(r"^peak heap memory consumption: (\S+)", line)
+            if match:
+                summary.peak_heap = _parse_size(match.group(1))
+                continue
+            match = re.match(r"^(\S+) peak memory consumed over \d+ calls from$", line)
+            if match and i + 1 < len(lines) and len(summary.top_symbols) < TOP_SYMBOL_COUNT:
+                summary.top_symbols.append((lines[i + 1].strip(), match.group(1)))
+        return summary
+
+
+PROFILERS = {
+    p.name: p for p in [PerfProfiler, MassifProfiler, HeaptrackProfiler]
+}
@@ -3,22 +3,51 @@ import time
 import pyroute2
 import subprocess
 import json
+import shutil
 from logging import Logger
 from tempfile import TemporaryDirectory
 from pyroute2 import IPRoute, NetNS
 import pyroute2.netns
-from typing import List
+from typing import Dict, List
 
 from .loader import TestSuite, InterfaceFile
 from .writer import ResultWriter
 from .compare import Compare
-from .process import start_process, run_process
+from .process import start_process, run_process, stop_processes, TimestampedLog
+from .profile import Profiler, ProfileError
+from .soak import SoakOptions, Sample, slope_per_minute
+from .fixture import Fixture, FixturePool, UBUS_PATH
+from .cache import ResultCache, CachedResult
+from .timeline import Timeline
 
-
-UBUSD_PATH = "/opt/netifd/sbin/ubusd"
-UBUS_PATH = "/opt/netifd/bin/ubus"
 DHCPD_PATH = "/usr/sbin/dhcpd"
 NETIFD_PATH = "/opt/netifd/sbin/netifd"
+# built with the shell protocol handlers, for suites with their own proto scripts
+NETIFD_SHELL_PATH = "/opt/netifd/sbin/netifd-shell"
+
+# profilers need time to write their data after netifd was terminated
+PROFILE_TERMINATE_TIMEOUT = 60
+# until netifd must have handled a carrier change of a veth peer
+CARRIER_TIMEOUT = 5
+# until an interface must be up again after ifdown and ifup, covers the teardown timeout of proto-shell
+IFDOWN_TIMEOUT = 10
+# shared by all processes of a suite, not per process
+TEARDOWN_TIMEOUT = 3
+# captures are flushed once their process is gone
+LOG_FLUSH_TIMEOUT = 1
+# interface status fields that must survive a restart of netifd
+RESTART_INTERFACE_KEYS = ["up", "proto", "device", "l3_device", "ipv4-address", "ipv6-address",
+                          "ipv6-prefix", "route", "dns-server", "dns-search"]
+# captured for the timeline and kept in the results dir
+CAPTURE_FILES = ["netifd.log", "ubus.monitor", "ip.monitor"]
+# route changes of suites that check the events of a reload
+ROUTE_MONITOR_FILE = "route.monitor"
+# after the reload, until all route changes must have been reported
+RELOAD_SETTLE_TIME = 1
+# written by netifd to its cache dir once the network package was parsed
+CONFIG_SNAPSHOT_FILE = "network.snapshot"
+# logged when a start or reload replayed the snapshot instead of parsing the config
+CONFIG_SNAPSHOT_LOG = "Using network config snapshot"
 
 
 class Timer():
@@ -45,39 +74,39 @@ class TestSuiteRun():
     _netns_test: NetNS = None
     _ipr: IPRoute = None
     _processes: List[subprocess.Popen] = None
-    _veths: List[int] = None
+    _logs: List[TimestampedLog] = None
+    _pool: FixturePool = None
+    _fixture: Fixture = None
     _tempdir: TemporaryDirectory = None
-
-    def __init__(self, logger: Logger, result_writer: ResultWriter, suite: TestSuite) -> None:
+    _profiler: Profiler = None
+    _results_dir: str = None
+    _netifd: subprocess.Popen = None
+    _reload_started: float = 0
+    _reload_links: Dict[str, int] = None
+
+    def __init__(self, logger: Logger, result_writer: ResultWriter, suite: TestSuite,
+                 profiler: Profiler = None, results_dir: str = None, pool: FixturePool = None) -> None:
         self._logger = logger
         self._rw = result_writer
         self._suite = suite
         self._ipr = IPRoute()
         self._processes = []
-        self._veths = []
+        self._logs = []
+        self._pool = pool
+        self._profiler = profiler
+        if results_dir:
+            self._results_dir = os.path.join(os.path.abspath(results_dir), suite.name)
+
+    @property
+    def _veths(self) -> List[int]:
+        return self._fixture.veths if self._fixture else []
 
     def _add_veth_pair(self, name: str, peername: str, peermac: str = None) -> int:
-        self._ipr.link('add',
-            ifname=name,
-            kind='veth',
-            peer={
-                "ifname": peername,
-                "net_ns_fd": self._netns_test.netns
-            }
-        )
-        idx = self._ipr.link_lookup(ifname=name)[0]
-        self._ipr.link('set', index=idx, state='up')
-        if peermac:
-            self._netns_test.link('set', ifname=peername, address=peermac)
-        self._veths.append(idx)
-        return idx
+        return self._fixture.add_veth_pair(name, peername, peermac)
 
     def _get_temp_file(self, name: str) -> str:
         return os.path.join(self._tempdir.name, name)
 
-    def _setup_dummy_eth0(self) -> None:
-        self._add_veth_pair('netifd_eth0', 'eth0', '02:eb:eb:eb:eb:eb')
-
     def _setup_dhcp_servers(self) -> None:
         interfaces = {}
 
@@ -105,46 +134,81 @@ class TestSuiteRun():
                 "netifd_" + config.interface
             ], log = log)
 
-    def _start_process(self, cmd: List[str], netns: NetNS = None, log: str = None) -> None:
-        self._processes.append(start_process(cmd, netns, log))
+    def _start_process(self, cmd: List[str], netns: NetNS = None, log: str = None,
+                       timestamps: bool = False) -> subprocess.Popen:
+        if timestamps:
+            log = TimestampedLog(log)
+            self._logs.append(log)
+        process = start_process(cmd, netns, log)
+        self._processes.append(process)
+        return process
+
+    @property
+    def _config_dir(self) -> str:
+        # suites that change their config on reload get a private copy
+        if self._suite.reload_config:
+            return self._get_temp_file("config")
+        return os.path.dirname(self._suite.network_config)
 
-    def _start_ubusd(self) -> None:
-        self._start_process([UBUSD_PATH], self._netns_test)
+    def _setup_config(self) -> None:
+        if self._suite.reload_config:
+            os.mkdir(self._config_dir)
+            shutil.copy(self._suite.network_config, os.path.join(self._config_dir, "network"))
+
+    @property
+    def _cache_dir(self) -> str:
+        return self._get_temp_file("cache")
+
+    def _start_netifd(self, logname: str = "netifd.log") -> None:
+        wrapper = []
+        log = self._get_temp_file(logname)
+        if self._profiler:
+            os.makedirs(self._results_dir, exist_ok=True)
+            wrapper = self._profiler.command(self._results_dir)
+            log = os.path.join(self._results_dir, logname)
 
-    def _start_netifd(self) -> None:
         # We have to start netifd using ip netns exec,
         # otherwise /sys is not remounted and netifd
         # does not work correctly
-        self._start_process(
+        self._netifd = self._start_process(
             [
                 "ip",
                 "netns",
                 "exec",
                 self._netns_test.netns,
-                NETIFD_PATH,
-                "-c", os.path.dirname(self._suite.network_config),
+                *wrapper,
+                NETIFD_SHELL_PATH if self._suite.proto_dir else NETIFD_PATH,
+                "-c", self._config_dir,
                 "-r", self._get_temp_file("resolv.conf"),
+                "-C", self._cache_dir,
                 "-S",
-                "-p", "/",
+                "-p", os.path.dirname(self._suite.proto_dir) if self._suite.proto_dir else "/",
                 "-l", "4"
             ],
-            log = self._get_temp_file("netifd.log")
+            log = log,
+            timestamps = True
         )
 
-    def _wait_for_ubus(self) -> None:
-        t = Timer(1)
-        while True:
-            res = run_process(
-                [UBUS_PATH, "list"], 
-                self._netns_test, 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.DEVNULL
-            )
-            if res['rc'] == 0:
-                break
-            time.sleep(0.5)
-            if t.expired:
-                raise TimeoutError("Timeout waiting for ubus")
+    def _stop_profiled_netifd(self) -> None:
+        self._netifd.terminate()
+        try:
+            self._netifd.wait(PROFILE_TERMINATE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._rw.fail("netifd did not exit, the profile may be incomplete")
+            self._netifd.kill()
+            self._netifd.wait()
+
+    def _summarize_profile(self) -> None:
+        with self._rw.start_test("Profile"):
+            try:
+                summary = self._profiler.summarize(self._results_dir)
+            except ProfileError as e:
+                self._rw.fatal(str(e))
+                return
+            for name, value in summary.properties().items():
+                self._rw.add_property(name, value)
+            self._rw.add_output(str(summary))
+            self._logger.info("%s profile of %s:\n%s", self._profiler.name, self._suite.name, summary)
 
     def _wait_for_network(self) -> bool:
         return run_process(
@@ -171,7 +235,7 @@ class TestSuiteRun():
         return (res['rc'] == 0, res['stdout'])
 
     def _wait_for_interfaces(self) -> None:
-        remaining = self._suite.waitfor_interfaces
+        remaining = list(self._suite.waitfor_interfaces)
 
         if not remaining:
             return
@@ -194,26 +258,37 @@ class TestSuiteRun():
             if timer.expired:
                 raise TimeoutError("Timeout waiting for interfaces: " + ", ".join(remaining))
 
-    def _make_dummy_sysmount(self) -> None:
-        # ip netns exec tries to mount /sys in the namespace.
-        # In order to do that it lazy umounts /sys first.
-        # If this is the only mounted sysfs, further attempts to mount sys fail no with EPERM
-        # Just mounting another sysfs somewhere else resolves the problem
-        path = self._get_temp_file("dummy_sys_mount")
-        os.mkdir(path)
-        os.system(f"mount -t sysfs none {path}")
+    def _acquire_fixture(self) -> None:
+        if self._pool:
+            self._fixture = self._pool.acquire()
+            return
+        self._fixture = Fixture(self._logger, self._ipr)
+        self._fixture.setup()
+
+    def _release_fixture(self) -> None:
+        if self._pool:
+            self._pool.release(self._fixture)
+        else:
+            self._fixture.destroy()
+        self._fixture = None
+        self._netns_test = None
 
     def start(self):
         self._tempdir = TemporaryDirectory()
-        self._make_dummy_sysmount()
-        self._netns_test = NetNS("test")
-        self._setup_dummy_eth0()
+        self._acquire_fixture()
+        self._netns_test = self._fixture.netns
+        self._setup_config()
+        os.mkdir(self._cache_dir)
         self._setup_dhcp_servers()
 
-        self._start_ubusd()
-        self._logger.debug("Waiting for ubus to start")
-        self._wait_for_ubus()
-        self._start_process(["/opt/netifd/bin/ubus", "monitor"], self._netns_test, self._get_temp_file("ubus.monitor"))
+        # ubus does not flush its output when writing to a pipe
+        self._start_process(["stdbuf", "-oL", UBUS_PATH, "monitor"], self._netns_test,
+                            self._get_temp_file("ubus.monitor"), timestamps=True)
+        self._start_process(["ip", "monitor", "address"], self._netns_test,
+                            self._get_temp_file("ip.monitor"), timestamps=True)
+        if "routes" in self._suite.reload_events:
+            self._start_process(["ip", "monitor", "route"], self._netns_test,
+                                self._get_temp_file(ROUTE_MONITOR_FILE), timestamps=True)
         self._logger.debug("Starting netifd")
         self._start_netifd()
         if not self._wait_for_network():
@@ -221,6 +296,258 @@ class TestSuiteRun():
 
         self._wait_for_interfaces()
 
+    def reload_network(self) -> None:
+        ok, out = self._call_ubus(["call", "network", "reload"])
+        if not ok:
+            raise RuntimeError("network reload failed: " + out)
+
+    def reload(self) -> None:
+        """
+        Replace the config with the suite's network.reload and reload netifd
+        """
+        devices = self._suite.reload_events.get("devices", {})
+        if devices:
+            self._reload_links = self._wait_for_links(devices.get("removed", []) + devices.get("kept", []))
+        self._reload_started = time.monotonic()
+        shutil.copy(self._suite.reload_config, os.path.join(self._config_dir, "network"))
+        self.reload_network()
+        self._wait_for_interfaces()
+
+    def _link_indexes(self) -> Dict[str, int]:
+        return {link["ifname"]: link["ifindex"] for link in self._ip_json(["link", "show"])}
+
+    def _wait_for_links(self, names: List[str]) -> Dict[str, int]:
+        """
+        Wait until all links in <names> exist and return the ifindex of every link
+        """
+        timer = Timer(15)
+        while True:
+            links = self._link_indexes()
+            missing = [name for name in names if name not in links]
+            if not missing:
+                return links
+            time.sleep(0.5)
+            if timer.expired:
+                raise TimeoutError("Timeout waiting for devices: " + ", ".join(missing))
+
+    def _device_status(self) -> dict:
+        ok, out = self._call_ubus(["call", "network.device", "status"])
+        if not ok:
+            raise RuntimeError("Cannot get device status: " + out)
+        return json.loads(out)
+
+    def _route_events(self, since: float) -> Dict[str, Dict[str, int]]:
+        """
+        Count the route messages per destination, a replaced route is
+        reported as a new one
+        """
+        events = {}
+        with open(self._get_temp_file(ROUTE_MONITOR_FILE), "r") as f:
+            for line in f:
+                timestamp, _, message = line.rstrip("\n").partition(" ")
+                if float(timestamp) < since:
+                    continue
+                fields = message.split()
+                kind = "new"
+                if fields and fields[0] == "Deleted":
+                    kind = "deleted"
+                    fields = fields[1:]
+                if not fields:
+                    continue
+                counts = events.setdefault(fields[0], {"new": 0, "deleted": 0})
+                counts[kind] += 1
+        return events
+
+    def validate_reload_events(self) -> None:
+        """
+        Compare the route messages since the reload with the suite's
+        reload.json, a route that is only updated must not be deleted.
+        Devices removed from the config must be gone from the kernel and
+        from netifd, the devices that are kept must keep their ifindex.
+        """
+        routes = self._suite.reload_events.get("routes", {})
+        devices = self._suite.reload_events.get("devices", {})
+        if routes or devices:
+            time.sleep(RELOAD_SETTLE_TIME)
+        if routes:
+            events = self._route_events(self._reload_started)
+        for dst, expected in routes.items():
+            with self._rw.start_test(dst):
+                actual = events.get(dst, {"new": 0, "deleted": 0})
+                self._rw.add_output(f"{dst}: {actual['new']} new, {actual['deleted']} deleted")
+                for kind in ["new", "deleted"]:
+                    if actual[kind] != expected.get(kind, 0):
+                        self._rw.fail(f"Expected {expected.get(kind, 0)} {kind} messages for {dst}, got {actual[kind]}")
+
+        if not devices:
+            return
+        with self._rw.start_test("Devices"):
+            try:
+                links = self._link_indexes()
+                status = self._device_status()
+            except (RuntimeError, ValueError) as e:
+                self._rw.fatal(str(e))
+                return
+        before = self._reload_links or {}
+        for name in devices.get("removed", []):
+            with self._rw.start_test(name):
+                if name not in before:
+                    self._rw.fail(f"{name} did not exist before the reload")
+                if name in links:
+                    self._rw.fail(f"{name} still exists after it was removed from the config")
+                if name in status:
+                    self._rw.fail(f"netifd still lists {name} after it was removed from the config")
+        for name in devices.get("kept", []):
+            with self._rw.start_test(name):
+                if name not in links:
+                    self._rw.fail(f"{name} is gone after the reload")
+                elif name not in before:
+                    self._rw.fail(f"{name} did not exist before the reload")
+                else:
+                    self._rw.add_output(f"{name}: ifindex {before[name]} before, {links[name]} after the reload")
+                    if links[name] != before[name]:
+                        self._rw.fail(f"{name} was recreated by the reload, ifindex {before[name]} changed to {links[name]}")
+                if name not in status:
+                    self._rw.fail(f"netifd no longer lists {name} after the reload")
+
+    def _interface_status(self, intf: str) -> dict:
+        ok, out = self._call_ubus(["call", f"network.interface.{intf}", "status"])
+        if not ok:
+            raise RuntimeError(f"Cannot get status of {intf}: " + out)
+        return json.loads(out)
+
+    def ifdown(self) -> None:
+        """
+        Take down and up again each interface of the suite's ifdown list,
+        one after the other. An interface is only set up again once its
+        teardown finished or was killed.
+        """
+        for intf, min_time in self._suite.ifdown_interfaces:
+            with self._rw.start_test(intf):
+                start = time.monotonic()
+                try:
+                    for action in ["down", "up"]:
+                        ok, out = self._call_ubus(["call", f"network.interface.{intf}", action])
+                        if not ok:
+                            raise RuntimeError(f"if{action} of {intf} failed: " + out)
+
+                    timer = Timer(IFDOWN_TIMEOUT + min_time)
+                    while not self._interface_status(intf)["up"]:
+                        if timer.expired:
+                            raise TimeoutError(f"{intf} did not come up again after ifdown")
+                        time.sleep(0.1)
+                except (RuntimeError, TimeoutError) as e:
+                    self._rw.fatal(str(e))
+                    continue
+
+                elapsed = time.monotonic() - start
+                self._rw.add_property(f"ifdown.{intf}_s", "%0.3f" % elapsed)
+                if elapsed < min_time:
+                    self._rw.fail(f"{intf} was up again after {elapsed:.3f}s, expected at least {min_time}s")
+
+    def _ip_json(self, args: List[str]) -> list:
+        res = run_process(["ip", "-j", *args], self._netns_test, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if res["rc"] != 0:
+            raise RuntimeError(f"ip {' '.join(args)} failed: " + res["stderr"])
+        return json.loads(res["stdout"] or "[]")
+
+    def capture_state(self) -> dict:
+        """
+        State of netifd and of the kernel that does not depend on when
+        netifd was started, lifetimes and uptimes are left out
+        """
+        ok, out = self._call_ubus(["call", "network.interface", "dump"])
+        if not ok:
+            raise RuntimeError("Cannot dump interfaces: " + out)
+        interfaces = {
+            i["interface"]: {key: i.get(key) for key in RESTART_INTERFACE_KEYS}
+                for i in json.loads(out)["interface"]
+        }
+
+        addresses = sorted(
+            f"{link['ifname']} {a['local']}/{a['prefixlen']}"
+                for link in self._ip_json(["addr", "show"])
+                for a in link.get("addr_info", [])
+                if a.get("scope") != "link"
+        )
+
+        routes = sorted(
+            " ".join(f"{key} {r[key]}" for key in ["dst", "gateway", "dev", "metric", "table"] if key in r)
+                for family in ["-4", "-6"]
+                for r in self._ip_json([family, "route", "show", "table", "all", "proto", "static"])
+        )
+
+        ok, out = self._call_ubus(["call", "network", "get_proto_handlers"])
+        if not ok:
+            raise RuntimeError("Cannot get proto handlers: " + out)
+
+        return {
+            "interfaces": interfaces,
+            "addresses": addresses,
+            "routes": routes,
+            "proto_handlers": json.loads(out)
+        }
+
+    def _handler_cache_inode(self) -> int:
+        try:
+            return os.stat(os.path.join(self._cache_dir, "handlers.json")).st_ino
+        except FileNotFoundError:
+            return None
+
+    def restart_netifd(self, logname: str) -> None:
+        """
+        Stop netifd and start it again with the same config and cache dir
+        """
+        stop_processes([self._netifd], TEARDOWN_TIMEOUT)
+        self._processes.remove(self._netifd)
+        self._start_netifd(logname)
+        if not self._wait_for_network():
+            raise TimeoutError("Timeout waiting for netifd after restart")
+        self._wait_for_interfaces()
+
+    def used_config_snapshot(self, logname: str) -> bool:
+        with open(self._get_temp_file(logname), "r", errors="replace") as f:
+            return any(CONFIG_SNAPSHOT_LOG in line for line in f)
+
+    def restart(self) -> None:
+        """
+        Stop netifd and start it again with the same config and cache
+        dir, the second start has to end up in the same state
+        """
+        with self._rw.start_test("Setup"):
+            if self._profiler:
+                # the profile of the first run would be overwritten
+                self._rw.fatal("Restart cannot be combined with a profiled netifd")
+                return
+            try:
+                before = self.capture_state()
+                # the file is replaced whenever a dump was not taken from it
+                cache_inode = self._handler_cache_inode()
+                if self._suite.proto_dir and cache_inode is None:
+                    self._rw.fail("The handler cache was not written")
+                if not os.path.exists(os.path.join(self._cache_dir, CONFIG_SNAPSHOT_FILE)):
+                    self._rw.fail("The network config snapshot was not written")
+                start = time.monotonic()
+                self.restart_netifd("netifd.restart.log")
+                self._rw.add_property("restart_time", "%0.3f" % (time.monotonic() - start))
+                after = self.capture_state()
+            except (RuntimeError, TimeoutError, ValueError) as e:
+                self._rw.fatal(str(e))
+                return
+            if cache_inode is not None and self._handler_cache_inode() != cache_inode:
+                self._rw.fail("The handler cache was rewritten, the second start did not use it")
+            if not self.used_config_snapshot("netifd.restart.log"):
+                self._rw.fail("The second start parsed the config instead of using the snapshot")
+
+        for key in before:
+            with self._rw.start_test(key):
+                if before[key] != after[key]:
+                    self._rw.fail("\n".join([
+                        f"{key} differ after restart",
+                        "Before: " + json.dumps(before[key], indent=2, sort_keys=True),
+                        "After: " + json.dumps(after[key], indent=2, sort_keys=True)
+                    ]))
+
     def _validate_nameserver(self, expected: str) -> None:
         with open(expected, "r") as f:
             expected_servers = set([l.strip() for l in f.readlines() if l.strip()])
@@ -316,6 +643,32 @@ class TestSuiteRun():
                             self._rw.fail(f"Value '{actual}' does not match expected value '{value}")
 
 
+    def get_stats(self, reset: bool = False) -> dict:
+        ok, out = self._call_ubus([
+            "call",
+            "network",
+            "stats",
+            json.dumps({"reset": reset})
+        ])
+        if not ok:
+            raise RuntimeError("Cannot get netifd stats: " + out)
+        return json.loads(out)
+
+    def _validate_stats(self, val_file: InterfaceFile):
+        with open(val_file.path) as f:
+            expected = json.load(f)
+
+        with self._rw.start_suite(val_file.name):
+            with self._rw.start_test("Setup"):
+                try:
+                    actual = self.get_stats()["stats"]
+                except RuntimeError as e:
+                    self._rw.fatal(str(e))
+                    return
+
+            cmp = Compare(self._rw)
+            cmp.compare(expected, actual, None)
+
     def validate(self):
         FILE_TO_FUNC = {
             "ipaddr4": "_validate_ip_addr",
@@ -325,6 +678,7 @@ class TestSuiteRun():
             "iproute6": "_validate_ip_route",
             "sysctl4": "_validate_sysctl",
             "sysctl6": "_validate_sysctl",
+            "stats": "_validate_stats",
         }
         for val_file in self._suite.validation_files:
             if val_file.type == "nameservers":
@@ -335,39 +689,149 @@ class TestSuiteRun():
             else:
                 raise NotImplemented(val_file.path)
 
+    def _soak_cycle(self) -> None:
+        self.reload_network()
+
+        for intf in self._suite.waitfor_interfaces:
+            for action in ["down", "up"]:
+                ok, out = self._call_ubus(["call", f"network.interface.{intf}", action])
+                if not ok:
+                    raise RuntimeError(f"ifdown/ifup of {intf} failed: " + out)
+
+        # Toggle the carrier of the veth peers to make netifd
+        # handle device hotplug events. Wait for netifd to see each
+        # change, otherwise interfaces that are still up from before
+        # the link went down would end the cycle early.
+        for veth in self._veths:
+            self._ipr.link('set', index=veth, state='down')
+        self._wait_for_carrier(False)
+        for veth in self._veths:
+            self._ipr.link('set', index=veth, state='up')
+        self._wait_for_carrier(True)
+
+        self._wait_for_interfaces()
+
+    def _wait_for_carrier(self, carrier: bool) -> None:
+        remaining = list(self._fixture.peers)
+        timer = Timer(CARRIER_TIMEOUT)
+        while remaining:
+            for dev in remaining[:]:
+                ok, out = self._call_ubus(["call", "network.device", "status", json.dumps({"name": dev})])
+                # devices netifd does not know about or does not use have nothing to handle
+                status = json.loads(out) if ok else {}
+                if not status.get("up") or status.get("carrier") == carrier:
+                    remaining.remove(dev)
+            if not remaining:
+                break
+            time.sleep(0.1)
+            if timer.expired:
+                raise TimeoutError(f"netifd did not see the carrier of {', '.join(remaining)} going {'up' if carrier else 'down'}")
+
+    def _check_soak_slope(self, samples: List[Sample], attr: str, name: str, unit: str, limit: float) -> None:
+        with self._rw.start_test(f"{name} growth"):
+            slope = slope_per_minute(samples, attr)
+            self._rw.add_property(f"{attr}_slope", "%0.3f" % slope)
+            if slope > limit:
+                self._rw.fail(f"{name} grows by {slope:.3f} {unit}/min (limit {limit} {unit}/min)")
+
+    def soak(self, options: SoakOptions) -> None:
+        samples = []
+        cycles = 0
+
+        with self._rw.start_suite("Soak"):
+            with self._rw.start_test("Cycles"):
+                if not self._netifd or self._netifd.poll() is not None:
+                    self._rw.fatal("netifd is not running")
+                    return
+                if self._profiler:
+                    # the pid would be the one of the profiler, not of netifd
+                    self._rw.fatal("Soak mode cannot sample a profiled netifd")
+                    return
+                pid = self._netifd.pid
+                start = time.monotonic()
+                end = start + options.duration
+                next_sample = start
+                try:
+                    while time.monotonic() < end:
+                        self._soak_cycle()
+                        cycles += 1
+                        if time.monotonic() >= next_sample:
+                            samples.append(Sample(pid, start, self.get_stats()))
+                            next_sample += options.interval
+                    samples.append(Sample(pid, start, self.get_stats()))
+                except (RuntimeError, TimeoutError, OSError, ValueError, KeyError) as e:
+                    self._rw.fatal(f"Soak failed after {cycles} cycles: {e}")
+                    return
+                self._rw.add_property("cycles", str(cycles))
+                self._logger.info("Soak of %s finished %d cycles", self._suite.name, cycles)
+
+            if self._results_dir:
+                os.makedirs(self._results_dir, exist_ok=True)
+                with open(os.path.join(self._results_dir, "soak.csv"), "w") as f:
+                    f.write(Sample.CSV_HEADER + "\n")
+                    f.writelines(f"{s}\n" for s in samples)
+
+            samples = [s for s in samples if s.time >= options.warmup]
+            self._check_soak_slope(samples, "rss", "RSS", "KiB", options.rss_slope)
+            self._check_soak_slope(samples, "fds", "Open fds", "fds", options.fd_slope)
+            self._check_soak_slope(samples, "processes", "Child processes", "processes", options.process_slope)
+            self._check_soak_slope(samples, "timers", "Pending timers", "timers", options.timer_slope)
+
     def shell_in_ns(self) -> None:
-        pyroute2.netns.pushns("test")
+        pyroute2.netns.pushns(self._fixture.name)
         os.system("bash")
         pyroute2.netns.popns()
 
+    def _export_timeline(self) -> None:
+        with self._rw.start_test("Timeline"):
+            try:
+                os.makedirs(self._results_dir, exist_ok=True)
+                # keep the raw captures, the tempdir is deleted with the suite.
+                # A profiled netifd already logs into the results dir.
+                for name in CAPTURE_FILES:
+                    path = self._get_temp_file(name)
+                    if os.path.exists(path):
+                        shutil.copy(path, os.path.join(self._results_dir, name))
+
+                timeline = Timeline(*[os.path.join(self._results_dir, name) for name in CAPTURE_FILES])
+                data = timeline.to_dict()
+                with open(os.path.join(self._results_dir, "timeline.json"), "w") as f:
+                    json.dump(data, f, indent=2)
+            except OSError as e:
+                self._rw.fatal("Cannot export timeline: " + str(e))
+                return
+
+            for interface, stages in data["latencies"].items():
+                for stage, ms in stages.items():
+                    self._rw.add_property(f"latency.{interface}.{stage}_ms", "%0.3f" % ms)
+                self._logger.debug("Bring-up of %s: %s", interface,
+                                   ", ".join(f"{stage} {ms:.1f}ms" for stage, ms in stages.items()))
+
     def cleanup(self):
+        if self._profiler and self._netifd:
+            with self._rw.start_test("Teardown netifd"):
+                self._stop_profiled_netifd()
+            self._summarize_profile()
+            self._netifd = None
+
         with self._rw.start_test("Teardown"):
-            for veth in self._veths:
-                self._ipr.link('del', index = veth)
-            self._veths = []
-            if self._netns_test:
-                self._netns_test.remove()
-                self._netns_test.close()
-                self._netns_test = None
-            for process in reversed(self._processes):
-                try:
-                    process.terminate()
-                    try:
-                        process.wait(3)
-                    except subprocess.TimeoutExpired:
-                        process.kill()
-                        process.wait()
-                    if hasattr(process, "release"):
-                        process.release()
-                except:
-                    pass
+            start = time.monotonic()
+            killed = stop_processes(self._processes, TEARDOWN_TIMEOUT)
+            if killed:
+                self._logger.debug("Killed %d processes ignoring SIGTERM", len(killed))
             self._processes = []
-            if self._tempdir:
-                path = self._get_temp_file("dummy_sys_mount")
-                if os.path.isdir(path):
-                    os.system(f"umount {path}")
-                self._tempdir.cleanup()
-                self._tempdir = None
+            for log in self._logs:
+                log.join(LOG_FLUSH_TIMEOUT)
+            self._logs = []
+            if self._fixture:
+                self._release_fixture()
+            self._rw.add_property("teardown_time", "%0.3f" % (time.monotonic() - start))
+
+        if self._tempdir:
+            if self._results_dir:
+                self._export_timeline()
+            self._tempdir.cleanup()
+            self._tempdir = None
 
     def __enter__(self):
         return self
@@ -392,12 +856,31 @@ class TestRunner():
                 suites.append(TestSuite(fullpath))
         self.suites = suites
 
-    def run(self, result_writer: ResultWriter, suites: List[TestSuite] = None, shell = False):
+    def _replay(self, result_writer: ResultWriter, suite: TestSuite, cached: CachedResult) -> None:
+        self._logger.info("Inputs of %s are unchanged, replaying cached result", suite.name)
+        for name in cached.tests:
+            with result_writer.start_test(name):
+                result_writer.add_output("Cached result")
+        for name, value in cached.properties.items():
+            result_writer.add_property(name, value)
+        result_writer.add_property("cached", "true")
+
+    def run(self, result_writer: ResultWriter, suites: List[TestSuite] = None, shell = False,
+            profiler: Profiler = None, results_dir: str = None, soak: SoakOptions = None,
+            cache: ResultCache = None):
         suites = suites or self.suites
-        try:
+        # profiles, soak samples and shells are side effects a cached result cannot replay
+        if shell or profiler or soak:
+            cache = None
+        with FixturePool(self._logger) as pool:
             for suite in suites:
+                key = cache.key(suite) if cache else None
                 with result_writer.start_suite(suite.name):
-                    with TestSuiteRun(self._logger, result_writer, suite) as run:
+                    cached = cache.get(suite, key) if key else None
+                    if cached:
+                        self._replay(result_writer, suite, cached)
+                        continue
+                    with TestSuiteRun(self._logger, result_writer, suite, profiler, results_dir, pool) as run:
                         with result_writer.start_test("Setup"):
                             try:
                                 run.start()
@@ -405,9 +888,33 @@ class TestRunner():
                                 result_writer.fatal("Timeout: " + e.args[0])
                             if shell:
                                 run.shell_in_ns()
+                        if suite.reload_config:
+                            with result_writer.start_test("Reload"):
+                                try:
+                                    run.reload()
+                                except (RuntimeError, TimeoutError) as e:
+                                    result_writer.fatal(str(e))
+                            if suite.reload_events:
+                                with result_writer.start_suite("Reload events"):
+                                    run.validate_reload_events()
+                        if suite.ifdown_interfaces:
+                            with result_writer.start_suite("Ifdown"):
+                                run.ifdown()
+                        if suite.restart:
+                            with result_writer.start_suite("Restart"):
+                                run.restart()
                         run.validate()
-        except KeyboardInterrupt:
-            raise
+                        if soak:
+                            run.soak(soak)
+                    if not key:
+                        continue
+                    if result_writer.suite_failed:
+                        cache.invalidate(suite)
+                    else:
+                        cache.put(suite, key, CachedResult(
+                            result_writer.suite_tests(),
+                            result_writer.suite_properties()
+                        ))
 
     def get_suite(self, name: str) -> TestSuite:
         if name.startswith("test_"):
@@ -0,0 +1,69 @@
+import os
+import time
+from typing import List
+
+class SoakOptions():
+    duration: float
+    interval: float
+    warmup: float
+    rss_slope: float
+    fd_slope: float
+    process_slope: float
+    timer_slope: float
+
+    def __init__(self, duration: float, interval: float = 5, warmup: float = None,
+                 rss_slope: float = 64, fd_slope: float = 0.5, process_slope: float = 0.5,
+                 timer_slope: float = 0.5) -> None:
+        self.duration = duration
+        self.interval = interval
+        self.warmup = duration / 10 if warmup is None else warmup
+        self.rss_slope = rss_slope
+        self.fd_slope = fd_slope
+        self.process_slope = process_slope
+        self.timer_slope = timer_slope
+
+class Sample():
+    time: float
+    rss: int
+    fds: int
+    processes: int
+    timers: int
+
+    CSV_HEADER = "time,rss_kb,fds,processes,timers"
+
+    def __init__(self, pid: int, start: float, stats: dict) -> None:
+        """
+        <stats> is the reply of the network stats method, netifd counts
+        its own running processes and pending timers there
+        """
+        self.time = time.monotonic() - start
+        self.rss = self._read_rss(pid)
+        self.fds = len(os.listdir(f"/proc/{pid}/fd"))
+        self.processes = stats["processes"]
+        self.timers = stats["timers"]
+
+    @staticmethod
+    def _read_rss(pid: int) -> int:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+        return 0
+
+    def __str__(self) -> str:
+        return f"{self.time:.1f},{self.rss},{self.fds},{self.processes},{self.timers}"
+
+def slope_per_minute(samples: List[Sample], attr: str) -> float:
+    """
+    Least squares slope of <attr> over time, scaled to one minute
+    """
+    if len(samples) < 2:
+        return 0
+    n = len(samples)
+    mean_t = sum(s.time for s in samples) / n
+    mean_v = sum(getattr(s, attr) for s in samples) / n
+    num = sum((s.time - mean_t) * (getattr(s, attr) - mean_v) for s in samples)
+    den = sum((s.time - mean_t) ** 2 for s in samples)
+    if den == 0:
+        return 0
+    return num / den * 60
@@ -0,0 +1,220 @@
+import re
+import json
+from typing import Dict, List, Optional
+
+# Captures written through process.TimestampedLog: "<monotonic time> <line>"
+TIMESTAMP_RE = re.compile(r"^(?P<time>\d+\.\d+) (?P<line>.*)$")
+
+# "<- 1a2b3c4d #5e6f7a8b         invoke: {...}" from ubus monitor
+UBUS_MONITOR_RE = re.compile(r"^(?P<dir><-|->) [0-9a-f]{8} #[0-9a-f]{8}\s+(?P<type>\S+): (?P<data>.*)$")
+
+# netifd -l 4, process output is prefixed with the log_prefix of the
+# process, which is the interface name for the DHCP clients
+NETIFD_LOG_RE = [
+    ("setup", re.compile(r"^Interface '(?P<interface>[^']+)' is setting up now")),
+    ("up", re.compile(r"^Interface '(?P<interface>[^']+)' is now up")),
+    ("down", re.compile(r"^Interface '(?P<interface>[^']+)' is now down")),
+    ("dhcp_lease", re.compile(r"^(?P<interface>\S+) \(\d+\): .*lease of (?P<address>[0-9a-fA-F.:]+) obtained")),
+    ("link", re.compile(r"^.+ '(?P<device>[^']+)' link is (?P<detail>up|down)")),
+]
+
+# "3: eth0    inet 10.0.0.2/24 brd ..." from ip monitor address
+IP_ADDRESS_RE = re.compile(r"^\d+: (?P<device>[^\s:@]+)\s+inet6? (?P<address>[0-9a-fA-F.:]+)/\d+")
+
+# name, start, end: latency between the first events of the two kinds of an interface
+LATENCIES = [
+    ("setup_to_lease", "setup", "lease"),
+    ("lease_to_notify_proto", "lease", "notify_proto"),
+    ("notify_proto_to_address", "notify_proto", "address"),
+    ("setup_to_address", "setup", "address"),
+    ("address_to_up", "address", "up"),
+    ("up_to_update", "up", "interface.update"),
+    ("setup_to_up", "setup", "up"),
+]
+
+
+class Event():
+    time: float
+    source: str
+    kind: str
+    interface: Optional[str]
+    device: Optional[str]
+    address: Optional[str]
+    detail: Optional[str]
+
+    def __init__(self, time: float, source: str, kind: str, interface: str = None,
+                 device: str = None, address: str = None, detail: str = None) -> None:
+        self.time = time
+        self.source = source
+        self.kind = kind
+        self.interface = interface
+        self.device = device
+        self.address = address
+        self.detail = detail
+
+    def to_dict(self, start: float) -> dict:
+        res = {
+            "time": round(self.time - start, 6),
+            "source": self.source,
+            "kind": self.kind
+        }
+        for key in ["interface", "device", "address", "detail"]:
+            if getattr(self, key) is not None:
+                res[key] = getattr(self, key)
+        return res
+
+    def __repr__(self) -> str:
+        return f"Event({self.time:.6f}, {self.source}, {self.kind}, {self.interface or self.device})"
+
+
+def _read_timestamped(path: str):
+    try:
+        with open(path, errors="replace") as f:
+            for line in f:
+                m = TIMESTAMP_RE.match(line.rstrip("\n"))
+                if m:
+                    yield float(m.group("time")), m.group("line")
+    except FileNotFoundError:
+        return
+
+
+def parse_netifd_log(path: str) -> List[Event]:
+    events = []
+    for time, line in _read_timestamped(path):
+        for kind, regex in NETIFD_LOG_RE:
+            m = regex.match(line)
+            if m:
+                events.append(Event(time, "netifd", kind, **m.groupdict()))
+                break
+    return events
+
+
+def _ubus_event(time: float, msg_type: str, msg: dict) -> Optional[Event]:
+    method = msg.get("method")
+    data = msg.get("data") or {}
+    if msg_type == "invoke" and method == "notify_proto":
+        # proto-shell scripts pass "interface", udhcp-script the environment of udhcpc
+        return Event(time, "ubus", "notify_proto",
+            interface = data.get("interface") or data.get("NETIFD_INTERFACE"),
+            address = data.get("ip") or data.get("ipv6"),
+            detail = data.get("reason") or (str(data["action"]) if "action" in data else None)
+        )
+    if msg_type == "invoke" and method == "send":
+        inner = data.get("data") or {}
+        return Event(time, "ubus", "event",
+            interface = inner.get("interface"),
+            detail = " ".join(filter(None, [data.get("id"), inner.get("action")]))
+        )
+    if msg_type == "invoke" and method == "hotplug_event":
+        return Event(time, "ubus", "hotplug",
+            device = data.get("name"),
+            detail = "add" if data.get("add") else "remove"
+        )
+    if msg_type == "notify" and method in ("interface.update", "interface.down"):
+        addrs = data.get("ipv4-address") or data.get("ipv6-address") or []
+        return Event(time, "ubus", method,
+            interface = data.get("interface"),
+            device = data.get("l3_device") or data.get("device"),
+            address = addrs[0].get("address") if addrs else None
+        )
+    return None
+
+
+def parse_ubus_monitor(path: str) -> List[Event]:
+    events = []
+    for time, line in _read_timestamped(path):
+        m = UBUS_MONITOR_RE.match(line)
+        # every message shows up twice, use the copy ubusd received from the sender
+        if not m or m.group("dir") != "<-":
+            continue
+        try:
+            msg = json.loads(m.group("data"))
+        except ValueError:
+            continue
+        if not isinstance(msg, dict):
+            continue
+        event = _ubus_event(time, m.group("type"), msg)
+        if event:
+            events.append(event)
+    return events
+
+
+def parse_ip_monitor(path: str) -> List[Event]:
+    events = []
+    for time, line in _read_timestamped(path):
+        m = IP_ADDRESS_RE.match(line)
+        # link-local addresses come with the link, not with the configuration
+        if m and not m.group("address").lower().startswith("fe80:"):
+            events.append(Event(time, "kernel", "address", **m.groupdict()))
+    return events
+
+
+class Timeline():
+    """
+    Events of netifd, ubus and the kernel of one suite, ordered by the
+    time they were captured at, and the latencies between the stages of
+    each interface bring-up derived from them
+    """
+    events: List[Event]
+
+    def __init__(self, netifd_log: str, ubus_monitor: str, ip_monitor: str) -> None:
+        events = parse_netifd_log(netifd_log) + parse_ubus_monitor(ubus_monitor) + parse_ip_monitor(ip_monitor)
+        self.events = sorted(events, key=lambda e: e.time)
+        self._assign_interfaces()
+
+    def _assign_interfaces(self) -> None:
+        # kernel events only know the device, map them by address first,
+        # by the device netifd reported for the interface second
+        by_address = {}
+        by_device = {}
+        for e in self.events:
+            if not e.interface:
+                continue
+            if e.address:
+                by_address.setdefault(e.address, e.interface)
+            if e.device:
+                by_device.setdefault(e.device, e.interface)
+        for e in self.events:
+            if e.interface:
+                continue
+            e.interface = by_address.get(e.address) or by_device.get(e.device)
+
+    @property
+    def start(self) -> float:
+        return self.events[0].time if self.events else 0
+
+    def _first(self, interface: str, kind: str, after: float) -> Optional[float]:
+        for e in self.events:
+            if e.interface == interface and e.kind == kind and e.time >= after:
+                return e.time
+        return None
+
+    def latencies(self) -> Dict[str, Dict[str, float]]:
+        """
+        Latencies in ms of the first bring-up of every interface
+        """
+        res = {}
+        interfaces = sorted(set(e.interface for e in self.events if e.kind == "setup"))
+        for interface in interfaces:
+            setup = self._first(interface, "setup", 0)
+            times = {"setup": setup}
+            # the lease is the DHCP client log line, or the notification if the client does not log it
+            times["lease"] = self._first(interface, "dhcp_lease", setup)
+            times["notify_proto"] = self._first(interface, "notify_proto", times["lease"] or setup)
+            if times["lease"] is None:
+                times["lease"] = times["notify_proto"]
+            for kind in ["address", "up", "interface.update"]:
+                times[kind] = self._first(interface, kind, setup)
+
+            stages = {}
+            for name, begin, end in LATENCIES:
+                if times[begin] is not None and times[end] is not None and times[end] >= times[begin]:
+                    stages[name] = round((times[end] - times[begin]) * 1000, 3)
+            res[interface] = stages
+        return res
+
+    def to_dict(self) -> dict:
+        return {
+            "events": [e.to_dict(self.start) for e in self.events],
+            "latencies": self.latencies()
+        }
@@ -5,7 +5,7 @@ from datetime import datetime
 import xml.etree.ElementTree as ET
 
 from logging import Logger
-from typing import Deque
+from typing import Deque, Dict, List
 
 class ResultSuiteContext():
     _parent: 'ResultWriter'
@@ -111,6 +111,31 @@ class ResultWriter():
         ET.SubElement(self._current_test, "failure").text = message
         self._logger.error("Test %s failed: %s", self._current_test.get("name"), message)
 
+    def add_property(self, name: str, value: str):
+        properties = self._current_suite.find("properties")
+        if properties is None:
+            properties = ET.Element("properties")
+            self._current_suite.insert(0, properties)
+        prop = ET.SubElement(properties, "property")
+        prop.set("name", ".".join([*self._suite_stack, name]))
+        prop.set("value", value)
+
+    @property
+    def suite_failed(self) -> bool:
+        return self._current_suite.get("failures") != "0" or self._current_suite.get("errors") != "0"
+
+    def suite_tests(self) -> List[str]:
+        return [test.get("name") for test in self._current_suite.findall("testcase")]
+
+    def suite_properties(self) -> Dict[str, str]:
+        return {
+            prop.get("name"): prop.get("value")
+                for prop in self._current_suite.findall("properties/property")
+        }
+
+    def add_output(self, text: str):
+        ET.SubElement(self._current_test, "system-out").text = text
+
     def fatal(self, message: str):
         self._propagate_inc("errors")
         ET.SubElement(self._current_test, "error").text = message
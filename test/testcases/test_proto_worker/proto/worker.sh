@@ -0,0 +1,37 @@
+#!/bin/sh
+# Handler run by a persistent worker. With "hang" set, its teardown
+# never returns and has to be killed by netifd.
+NETIFD_MAIN_DIR=../../../../scripts
+PATH=/opt/netifd/bin:$PATH
+. $NETIFD_MAIN_DIR/netifd-proto.sh
+
+init_proto "$@"
+
+proto_worker_init_config() {
+	no_proto_task=1
+	available=1
+	persistent_worker=1
+
+	proto_config_add_string "ipaddr"
+	proto_config_add_boolean "hang"
+}
+
+proto_worker_setup() {
+	local interface="$1"
+	local device="$2"
+
+	json_get_var ipaddr ipaddr
+	proto_init_update "$device" 1
+	proto_add_ipv4_address "$ipaddr" 24
+	proto_send_update "$interface"
+}
+
+proto_worker_teardown() {
+	local interface="$1"
+
+	json_get_var hang hang
+	[ "$hang" = 1 ] && exec sleep 600
+	return 0
+}
+
+add_protocol worker
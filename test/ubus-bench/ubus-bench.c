@@ -0,0 +1,268 @@
+/*
+ * ubus-bench - concurrent ubus method throughput benchmark
+ *
+ * Forks a number of clients, each with its own ubus connection, that call
+ * one method in a loop until a shared deadline. The parent collects the
+ * per-call latencies and prints a JSON summary on stdout.
+ */
+#define _GNU_SOURCE
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <unistd.h>
+#include <time.h>
+#include <sys/wait.h>
+
+#include <libubus.h>
+#include <libubox/blobmsg.h>
+#include <libubox/blobmsg_json.h>
+
+#define MAX_CLIENTS	256
+
+struct client_result {
+	uint64_t requests;
+	uint64_t errors;
+	uint64_t n_latencies;
+};
+
+static uint64_t
+now_us(void)
+{
+	struct timespec ts;
+
+	clock_gettime(CLOCK_MONOTONIC, &ts);
+	return (uint64_t)ts.tv_sec * 1000000 + ts.tv_nsec / 1000;
+}
+
+static int
+write_all(int fd, const void *data, size_t len)
+{
+	const char *cur = data;
+
+	while (len > 0) {
+		ssize_t ret = write(fd, cur, len);
+
+		if (ret < 0)
+			return -1;
+
+		cur += ret;
+		len -= ret;
+	}
+
+	return 0;
+}
+
+static int
+read_all(int fd, void *data, size_t len)
+{
+	char *cur = data;
+
+	while (len > 0) {
+		ssize_t ret = read(fd, cur, len);
+
+		if (ret <= 0)
+			return -1;
+
+		cur += ret;
+		len -= ret;
+	}
+
+	return 0;
+}
+
+static int
+run_client(int fd, const char *socket, const char *object, const char *method,
+	   struct blob_attr *msg, int timeout, uint64_t start, uint64_t end)
+{
+	struct client_result res = {};
+	struct ubus_context *ctx;
+	uint32_t *latencies = NULL;
+	size_t size = 0;
+	uint32_t id;
+
+	ctx = ubus_connect(socket);
+	if (!ctx) {
+		fprintf(stderr, "Failed to connect to ubus\n");
+		return 1;
+	}
+
+	if (ubus_lookup_id(ctx, object, &id)) {
+		fprintf(stderr, "Object %s not found\n", object);
+		return 1;
+	}
+
+	while (now_us() < start)
+		usleep(100);
+
+	while (1) {
+		uint64_t t = now_us();
+
+		if (t >= end)
+			break;
+
+		res.requests++;
+		if (ubus_invoke(ctx, id, method, msg, NULL, NULL, timeout)) {
+			res.errors++;
+			continue;
+		}
+
+		if (res.n_latencies == size) {
+			size = size ? size * 2 : 4096;
+			latencies = realloc(latencies, size * sizeof(*latencies));
+			if (!latencies)
+				return 1;
+		}
+		latencies[res.n_latencies++] = now_us() - t;
+	}
+
+	ubus_free(ctx);
+
+	if (write_all(fd, &res, sizeof(res)) ||
+	    write_all(fd, latencies, res.n_latencies * sizeof(*latencies)))
+		return 1;
+
+	free(latencies);
+	return 0;
+}
+
+static int
+cmp_u32(const void *a, const void *b)
+{
+	uint32_t v1 = *(const uint32_t *)a, v2 = *(const uint32_t *)b;
+
+	return (v1 > v2) - (v1 < v2);
+}
+
+static uint32_t
+percentile(uint32_t *latencies, uint64_t n, int p)
+{
+	if (!n)
+		return 0;
+
+	return latencies[(n - 1) * p / 100];
+}
+
+static int
+usage(const char *progname)
+{
+	fprintf(stderr, "Usage: %s [<options>] <object> <method> [<message>]\n"
+		"Options:\n"
+		" -s <path>:		Path to the ubus socket\n"
+		" -c <clients>:		Number of concurrent clients (default: 1)\n"
+		" -d <seconds>:		Duration of the run (default: 5)\n"
+		" -t <ms>:		Timeout of a single call (default: 1000)\n"
+		"\n", progname);
+	return 1;
+}
+
+int
+main(int argc, char **argv)
+{
+	struct client_result total = {};
+	static struct blob_buf b;
+	const char *socket = NULL;
+	uint32_t *latencies = NULL;
+	int fds[MAX_CLIENTS];
+	int clients = 1, duration = 5, timeout = 1000;
+	uint64_t start, end;
+	int ch, i, ret = 0;
+
+	while ((ch = getopt(argc, argv, "s:c:d:t:")) != -1) {
+		switch (ch) {
+		case 's':
+			socket = optarg;
+			break;
+		case 'c':
+			clients = atoi(optarg);
+			break;
+		case 'd':
+			duration = atoi(optarg);
+			break;
+		case 't':
+			timeout = atoi(optarg);
+			break;
+		default:
+			return usage(argv[0]);
+		}
+	}
+
+	if (argc - optind < 2 || argc - optind > 3 ||
+	    clients < 1 || clients > MAX_CLIENTS || duration < 1)
+		return usage(argv[0]);
+
+	blob_buf_init(&b, 0);
+	if (argc - optind == 3 && !blobmsg_add_json_from_string(&b, argv[optind + 2])) {
+		fprintf(stderr, "Failed to parse message data\n");
+		return 1;
+	}
+
+	/* give all clients time to connect before the measurement starts */
+	start = now_us() + 500000;
+	end = start + (uint64_t)duration * 1000000;
+
+	for (i = 0; i < clients; i++) {
+		int pfd[2];
+		pid_t pid;
+
+		if (pipe(pfd) < 0)
+			return 1;
+
+		pid = fork();
+		if (pid < 0)
+			return 1;
+
+		if (!pid) {
+			close(pfd[0]);
+			_exit(run_client(pfd[1], socket, argv[optind], argv[optind + 1],
+					 b.head, timeout, start, end));
+		}
+
+		close(pfd[1]);
+		fds[i] = pfd[0];
+	}
+
+	for (i = 0; i < clients; i++) {
+		struct client_result res;
+
+		if (read_all(fds[i], &res, sizeof(res))) {
+			fprintf(stderr, "Client %d failed\n", i);
+			ret = 1;
+			goto next;
+		}
+
+		latencies = realloc(latencies, (total.n_latencies + res.n_latencies) * sizeof(*latencies));
+		if (!latencies && total.n_latencies + res.n_latencies)
+			return 1;
+
+		if (read_all(fds[i], latencies + total.n_latencies, res.n_latencies * sizeof(*latencies))) {
+			fprintf(stderr, "Client %d failed\n", i);
+			ret = 1;
+			goto next;
+		}
+
+		total.requests += res.requests;
+		total.errors += res.errors;
+		total.n_latencies += res.n_latencies;
+next:
+		close(fds[i]);
+	}
+
+	while (wait(NULL) > 0);
+
+	qsort(latencies, total.n_latencies, sizeof(*latencies), cmp_u32);
+
+	printf("{\"clients\": %d, \"duration\": %d, \"requests\": %llu, \"errors\": %llu, "
+	       "\"rps\": %.1f, \"latency_us\": {\"p50\": %u, \"p90\": %u, \"p99\": %u, \"max\": %u}}\n",
+	       clients, duration,
+	       (unsigned long long)total.requests, (unsigned long long)total.errors,
+	       (double)(total.requests - total.errors) / duration,
+	       percentile(latencies, total.n_latencies, 50),
+	       percentile(latencies, total.n_latencies, 90),
+	       percentile(latencies, total.n_latencies, 99),
+	       percentile(latencies, total.n_latencies, 100));
+
+	free(latencies);
+	return ret;
+}
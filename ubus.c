@@ -23,6 +23,7 @@
 #include "ubus.h"
 #include "system.h"
 #include "wireless.h"
+#include "stats.h"
 
 struct ubus_context *ubus_ctx = NULL;
 static struct blob_buf b;
@@ -202,6 +203,34 @@ netifd_netns_updown(struct ubus_context *ctx, struct ubus_object *obj,
 	return UBUS_STATUS_OK;
 }
 
+enum {
+	STATS_RESET,
+	__STATS_MAX
+};
+
+static const struct blobmsg_policy stats_policy[__STATS_MAX] = {
+	[STATS_RESET] = { .name = "reset", .type = BLOBMSG_TYPE_BOOL },
+};
+
+static int
+netifd_handle_stats(struct ubus_context *ctx, struct ubus_object *obj,
+		    struct ubus_request_data *req, const char *method,
+		    struct blob_attr *msg)
+{
+	struct blob_attr *tb[__STATS_MAX];
+
+	blobmsg_parse(stats_policy, __STATS_MAX, tb, blob_data(msg), blob_len(msg));
+
+	blob_buf_init(&b, 0);
+	netifd_stat_dump(&b);
+	ubus_send_reply(ctx, req, b.head);
+
+	if (blobmsg_get_bool_default(tb[STATS_RESET], false))
+		netifd_stat_reset();
+
+	return 0;
+}
+
 static struct ubus_method main_object_methods[] = {
 	{ .name = "restart", .handler = netifd_handle_restart },
 	{ .name = "reload", .handler = netifd_handle_reload },
@@ -209,6 +238,7 @@ static struct ubus_method main_object_methods[] = {
 	{ .name = "get_proto_handlers", .handler = netifd_get_proto_handlers },
 	UBUS_METHOD("add_dynamic", netifd_add_dynamic, dynamic_policy),
 	UBUS_METHOD("netns_updown", netifd_netns_updown, netns_updown_policy),
+	UBUS_METHOD("stats", netifd_handle_stats, stats_policy),
 };
 
 static struct ubus_object_type main_object_type =
@@ -808,6 +838,7 @@ netifd_dump_status(struct interface *iface)
 	struct interface_data *data;
 	struct device *dev;
 	void *a, *inactive;
+	uint64_t start = netifd_stat_start();
 
 	blobmsg_add_u8(&b, "up", iface->state == IFS_UP);
 	blobmsg_add_u8(&b, "pending", iface->state == IFS_SETUP);
@@ -933,6 +964,8 @@ netifd_dump_status(struct interface *iface)
 
 	if (!list_empty(&iface->errors))
 		netifd_add_interface_errors(&b, iface);
+
+	netifd_stat_stop(NETIFD_STAT_DUMP_STATUS, start);
 }
 
 static int
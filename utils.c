@@ -18,6 +18,8 @@
 #include <arpa/inet.h>
 #include <netinet/in.h>
 #include <sys/socket.h>
+#include <sys/stat.h>
+#include <errno.h>
 
 #ifdef __APPLE__
 #include <libproc.h>
@@ -146,6 +148,43 @@ format_macaddr(uint8_t *mac)
 	return str;
 }
 
+int
+mkdir_p(const char *path, mode_t mode)
+{
+	char *buf = alloca(strlen(path) + 1);
+	char *sep;
+
+	strcpy(buf, path);
+	for (sep = strchr(buf + 1, '/'); sep; sep = strchr(sep + 1, '/')) {
+		*sep = 0;
+		if (mkdir(buf, mode) < 0 && errno != EEXIST)
+			return -1;
+		*sep = '/';
+	}
+
+	if (mkdir(buf, mode) < 0 && errno != EEXIST)
+		return -1;
+
+	return 0;
+}
+
+const char *
+format_file_stamp(const char *path)
+{
+	static char str[96];
+	struct stat st;
+
+	if (stat(path, &st) < 0)
+		return "-";
+
+	snprintf(str, sizeof(str), "%llu:%lld:%lld.%09ld:%lld.%09ld",
+		 (unsigned long long) st.st_ino, (long long) st.st_size,
+		 (long long) st.st_mtim.tv_sec, st.st_mtim.tv_nsec,
+		 (long long) st.st_ctim.tv_sec, st.st_ctim.tv_nsec);
+
+	return str;
+}
+
 uint32_t
 crc32_file(FILE *fp)
 {
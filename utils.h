@@ -14,6 +14,7 @@
 #ifndef __NETIFD_UTILS_H
 #define __NETIFD_UTILS_H
 
+#include <sys/types.h>
 #include <unistd.h>
 #include <stdio.h>
 #include <uci_blob.h>
@@ -111,6 +112,8 @@ bool check_pid_path(int pid, const char *exe);
 
 char * format_macaddr(uint8_t *mac);
 
+int mkdir_p(const char *path, mode_t mode);
+const char *format_file_stamp(const char *path);
 uint32_t crc32_file(FILE *fp);
 
 const char * uci_get_validate_string(const struct uci_blob_param_list *p, int i);
@@ -219,7 +219,7 @@ veth_create(const char *name, struct device_type *devtype,
 		return NULL;
 	}
 
-	dev->config_pending = true;
+	device_set_config_pending(dev, true);
 
 	veth->set_state = dev->set_state;
 	dev->set_state = veth_set_state;
@@ -220,7 +220,7 @@ static struct device *get_vlan_device(struct device *dev, char *id_str, bool cre
 		goto error;
 
 	vldev->dev.default_config = true;
-	vldev->dev.config_pending = true;
+	device_set_config_pending(&vldev->dev, true);
 
 	vldev->set_state = vldev->dev.set_state;
 	vldev->dev.set_state = vlan_set_device_state;
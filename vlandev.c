@@ -397,7 +397,7 @@ vlandev_create(const char *name, struct device_type *devtype,
 		return NULL;
 	}
 
-	dev->config_pending = true;
+	device_set_config_pending(dev, true);
 
 	mvdev->set_state = dev->set_state;
 	dev->set_state = vlandev_set_state;